@@ -0,0 +1,410 @@
+"""Tablero Dash de Bitácoras Agronómicas.
+
+Es el módulo que sirve gunicorn (``gunicorn app:app``, ver ``Procfile.txt`` y
+``gunicorn.conf.py``). La carga de datos y la construcción del índice y del cubo
+(``cargar_instantanea``) están separadas de la construcción de Dash (``crear_app``): con
+``preload_app`` ambas corren una sola vez en el proceso maestro y los workers comparten
+el cubo, hecho de arreglos de NumPy, por copy-on-write después del ``fork``.
+
+Con ``BITACORAS_DIRECTORIO`` definido, un hilo vigila ese directorio y, cuando aparece
+una instantánea nueva de Datos_Historicos, la carga en segundo plano y la pone en
+servicio sin reiniciar (ver ``bitacoras.recarga``).
+
+Con ``BITACORAS_FILTRADO=cliente`` el cubo se envía al navegador una vez por sesión en un
+``dcc.Store`` y los filtros se resuelven con callbacks del lado del cliente
+(``assets/filtrado_cliente.js``): cambiar un menú ya no genera peticiones al servidor. Si el
+cubo serializado pasa de ``BITACORAS_CLIENTE_MAXIMO_MB`` se vuelve al filtrado en el servidor.
+
+La API de agregados (JSON, CSV o Arrow) se monta en ``/api/v1`` del mismo servidor (ver
+``bitacoras.api``). Las respuestas de Dash se comprimen y los assets llevan encabezados de caché (ver
+``bitacoras.respuestas``). Con ``BITACORAS_FIGURAS=ligeras`` las actualizaciones solo
+envían los datos de las trazas como actualizaciones parciales (``Patch``), sin la
+plantilla ni el layout de cada figura.
+
+Con ``BITACORAS_METRICAS=1`` se miden las peticiones, las etapas del callback y las cachés, y
+se exponen en ``/metrics`` para Prometheus; con ``BITACORAS_PERFIL`` se guarda el perfil de
+cProfile de la primera petición lenta (ver ``bitacoras.metricas``).
+
+Con ``BITACORAS_MOTOR=sqlite`` o ``duckdb`` las bitácoras se guardan en una base embebida y
+las gráficas y la API se resuelven con consultas SQL en lugar del cubo en memoria (ver
+``bitacoras.sql``).
+"""
+import logging
+import os
+import sys
+
+from dash import ClientsideFunction, Dash, Input, Output, Patch, State, dcc, html, no_update
+
+from bitacoras import (
+    TODOS,
+    CacheFiguras,
+    CuboAgregado,
+    FuenteDatos,
+    VigilanteDatos,
+    armar_filtros,
+    cargar_instantanea,
+    combinaciones_comunes,
+    crear_almacen,
+)
+from bitacoras.api import crear_api
+from bitacoras.cliente import serializar_cubo, tamano_cubo_mb
+from bitacoras.figuras import POSICIONES_FIGURAS, figuras_sin_filtros, opciones_menus, salidas_tablero, trazas_tablero
+from bitacoras.metricas import (
+    AYUDA_ETAPAS,
+    CUBETAS_CONTEOS,
+    PerfiladorLento,
+    RegistroMetricas,
+    cronometro,
+    instalar_metricas,
+    metricas_cache,
+)
+from bitacoras.respuestas import instalar_respuestas, url_asset
+
+logger = logging.getLogger(__name__)
+
+# Archivo de datos y modo de conteo de parcelas y productores únicos: "exacto" o "aproximado"
+# (HyperLogLog); en el aproximado, error relativo estándar buscado (más bajo: más memoria por celda)
+ARCHIVO_CSV = os.environ.get("BITACORAS_CSV", "Datos_Historicos_cuenta_al26032025.csv")
+MODO_DISTINTOS = os.environ.get("BITACORAS_DISTINTOS", "exacto")
+ERROR_HLL = float(os.environ.get("BITACORAS_ERROR_HLL", "0.02"))
+# Filas por bloque para leer el CSV por bloques y agregarlo sin cargarlo entero en memoria
+# (vacío: se carga completo, o desde su caché Feather)
+FILAS_POR_BLOQUE = int(os.environ.get("BITACORAS_FILAS_POR_BLOQUE", "0")) or None
+# Dónde viven los datos: "cubo" (agregados en memoria), "sqlite" o "duckdb" (base embebida en
+# .cache_bitacoras/, consultada en SQL; duckdb es opcional). Ver ``bitacoras.sql``
+MOTOR = os.environ.get("BITACORAS_MOTOR", "cubo")
+# Procesos para construir el cubo en paralelo al arrancar y en cada recarga (vacío o 1: un solo proceso)
+PROCESOS = int(os.environ.get("BITACORAS_PROCESOS", "0")) or None
+# Directorio donde se publican las nuevas instantáneas (vacío: sin recarga en caliente) y cada
+# cuántos segundos se revisa
+DIRECTORIO_DATOS = os.environ.get("BITACORAS_DIRECTORIO", "")
+INTERVALO_REVISION = float(os.environ.get("BITACORAS_INTERVALO", "60"))
+# Dónde se filtran los datos: "servidor" (un callback de Python por cambio de filtros) o "cliente"
+# (el cubo viaja al navegador y los filtros se resuelven en JavaScript)
+MODOS_FILTRADO = ("servidor", "cliente")
+FILTRADO = os.environ.get("BITACORAS_FILTRADO", "servidor")
+# Tamaño máximo (MB, sin comprimir) del cubo que viaja al navegador en cada carga de la página; si
+# el cubo lo supera al arrancar se usa el filtrado en el servidor ("0": sin límite)
+MAXIMO_CLIENTE_MB = float(os.environ.get("BITACORAS_CLIENTE_MAXIMO_MB", "8"))
+# Figuras de las actualizaciones: "completas" (figura entera) o "ligeras" (solo los datos de las trazas)
+MODOS_FIGURAS = ("completas", "ligeras")
+FIGURAS = os.environ.get("BITACORAS_FIGURAS", "completas")
+# Compresión gzip/Brotli de las respuestas de Dash ("0" la desactiva, p. ej. detrás de un proxy que ya comprime)
+COMPRESION = os.environ.get("BITACORAS_COMPRESION", "1") != "0"
+# Métricas de latencia en /metrics ("1" las activa) y, para depurar, directorio donde se guarda el
+# perfil de cProfile de la primera petición que tarde más de BITACORAS_PERFIL_UMBRAL segundos
+METRICAS = os.environ.get("BITACORAS_METRICAS", "0") == "1"
+DIRECTORIO_PERFIL = os.environ.get("BITACORAS_PERFIL", "")
+UMBRAL_PERFIL = float(os.environ.get("BITACORAS_PERFIL_UMBRAL", "0.5"))
+
+SALIDAS_TABLERO = [
+    Output("grafico-observaciones", "figure"), Output("total-observaciones", "children"),
+    Output("grafico-area-total", "figure"), Output("total-area", "children"),
+    Output("grafico-parcelas", "figure"), Output("total-parcelas", "children"),
+    Output("grafico-productores", "figure"), Output("total-productores", "children"),
+    Output("grafico-genero", "figure")
+]
+ENTRADAS_FILTROS = [
+    Input("categoria-dropdown", "value"), Input("ciclo-dropdown", "value"), Input("tipo-parcela-dropdown", "value"),
+    Input("estado-dropdown", "value"), Input("regimen-dropdown", "value")
+]
+# Opciones de los menús, que dependen de los demás filtros (mismo orden que ENTRADAS_FILTROS)
+SALIDAS_OPCIONES = [Output(entrada.component_id, "options") for entrada in ENTRADAS_FILTROS]
+FILTROS_INICIALES = armar_filtros(*[TODOS] * len(ENTRADAS_FILTROS))
+
+
+def crear_layout(app, instantanea):
+    """Layout de la aplicación, con el título y las opciones de los filtros tomados de la instantánea.
+
+    En el modo de filtrado en el cliente, ``app.cubo_cliente`` (ver ``serializar_cubo``) va en un
+    ``dcc.Store``; en el modo de figuras ligeras, ``app.figuras_iniciales`` son las cinco figuras que
+    después se actualizan parcialmente.
+    """
+    cubo = instantanea.cubo
+    # Cada menú con el conteo de bitácoras de sus valores; después los actualiza `actualizar_opciones`
+    opciones = opciones_menus(cubo.facetas(FILTROS_INICIALES), FILTROS_INICIALES)
+    cubo_cliente = app.cubo_cliente
+    figuras = app.figuras_iniciales or [{}] * len(POSICIONES_FIGURAS)
+    return html.Div([
+        # Cubo serializado para los callbacks del lado del cliente (solo en ese modo)
+        *([dcc.Store(id="cubo-cliente", data=cubo_cliente)] if cubo_cliente is not None else []),
+
+        # Encabezado con las imágenes y el título
+        html.Div([
+            html.Img(src=url_asset(app, "cimmyt.png"), style={"height": "100px", "marginRight": "20px"}),
+            html.H1(instantanea.titulo, style={"textAlign": "center", "flex": "1"}),
+            html.Img(src=url_asset(app, "ea.png"), style={"height": "100px", "marginLeft": "20px"})
+        ], style={"display": "flex", "alignItems": "center", "justifyContent": "space-between", "padding": "10px 20px"}),
+
+        # Contenedor principal con filtros y gráficos
+        html.Div([
+            # Gráficos
+            html.Div([
+                html.Div(id="total-observaciones", style={"textAlign": "center", "marginBottom": "10px", "fontSize": "18px", "fontWeight": "bold"}),
+                dcc.Graph(id="grafico-observaciones", figure=figuras[0], style={"height": "800px", "marginBottom": "50px"}),  # Primer gráfico
+                html.Hr(),  # Línea separadora
+
+                html.Div(id="total-area", style={"textAlign": "center", "marginBottom": "10px", "fontSize": "18px", "fontWeight": "bold"}),
+                dcc.Graph(id="grafico-area-total", figure=figuras[1], style={"height": "800px", "marginBottom": "50px"}),  # Segundo gráfico
+                html.Hr(),  # Línea separadora
+
+                html.Div(id="total-parcelas", style={"textAlign": "center", "marginBottom": "10px", "fontSize": "18px", "fontWeight": "bold"}),  # Total de parcelas
+                dcc.Graph(id="grafico-parcelas", figure=figuras[2], style={"height": "800px"}),  # Cuarto gráfico
+                html.Hr(),  # Línea separadora
+
+                html.Div(id="total-productores", style={"textAlign": "center", "marginBottom": "10px", "fontSize": "18px", "fontWeight": "bold"}),
+                dcc.Graph(id="grafico-productores", figure=figuras[3], style={"height": "800px", "marginBottom": "50px"}),  # Tercer gráfico
+                html.Hr(),  # Línea separadora
+
+                html.Div(id="total-genero", style={"textAlign": "center", "marginBottom": "10px", "fontSize": "18px", "fontWeight": "bold"}),  # Total por género
+                dcc.Graph(id="grafico-genero", figure=figuras[4], style={"height": "800px"})  # Quinto gráfico
+            ], style={"width": "80%", "padding": "20px"}),
+
+    # Filtros
+    html.Div([
+        html.Label("Categoría del Proyecto:"),
+        dcc.Dropdown(
+            id="categoria-dropdown",
+            options=opciones[0],
+            value="Todos"
+        ),
+        html.Label("Ciclo:"),
+        dcc.Dropdown(
+            id="ciclo-dropdown",
+            options=opciones[1],
+            value="Todos"
+        ),
+        html.Label("Tipo de Parcela:"),
+        dcc.Dropdown(
+            id="tipo-parcela-dropdown",
+            options=opciones[2],
+            value="Todos"
+        ),
+        html.Label("Estado:"),
+        dcc.Dropdown(
+            id="estado-dropdown",
+            options=opciones[3],
+            value="Todos"
+        ),
+        html.Label("Régimen Hídrico:"),
+        dcc.Dropdown(
+            id="regimen-dropdown",
+            options=opciones[4],
+            value="Todos"
+        )
+    ], className="filters-container", style={
+        "width": "15%",  # Ancho del contenedor
+        "padding": "10px 10px 0px 10px",  # Espaciado interno reducido (sin padding inferior)
+        "borderLeft": "1px solid #ccc",  # Borde izquierdo
+        "position": "sticky",  # Hace que el contenedor sea visible al desplazarse
+        "top": "0",  # Mantiene el contenedor visible desde la parte superior
+        "backgroundColor": "white",  # Fondo blanco
+        "zIndex": "1000",  # Asegura que esté por encima de otros elementos
+        "overflowY": "auto",  # Habilita el scroll interno si el contenido excede la altura
+        "height": "auto",  # Ajusta la altura automáticamente al contenido
+        "textAlign": "center"  # Centra el contenido dentro del contenedor
+    })
+        ], style={"display": "flex", "flexDirection": "row", "height": "100%", "margin": "0 50px"})
+    ])
+
+
+def parche_figura(propiedades):
+    """Actualización parcial de una figura: solo reemplaza las propiedades dadas de su primera traza."""
+    if not propiedades:
+        return no_update
+    parche = Patch()
+    for propiedad, valor in propiedades.items():
+        parche["data"][0][propiedad] = valor
+    return parche
+
+
+def cubo_en_limite(cubo_cliente, maximo_mb):
+    """Registra el tamaño del cubo del modo cliente y dice si cabe en ``maximo_mb`` (None o 0: sin límite)."""
+    mb, mb_gzip = tamano_cubo_mb(cubo_cliente)
+    logger.info("Cubo del modo cliente: %.1f MB (%.1f MB con gzip) por carga de la página", mb, mb_gzip)
+    if maximo_mb and mb > maximo_mb:
+        logger.warning("El cubo del modo cliente (%.1f MB) supera el límite de %.1f MB", mb, maximo_mb)
+        return False
+    return True
+
+
+def crear_app(instantanea, compartido=None, filtrado="servidor", figuras="completas", comprimir=True, metricas=None,
+              perfilador=None, maximo_cliente_mb=None):
+    """Construye la aplicación Dash sobre una instantánea ya cargada de los datos.
+
+    ``filtrado`` es "servidor" o "cliente" (ver ``MODOS_FILTRADO``) y ``figuras`` "completas" o
+    "ligeras" (ver ``MODOS_FIGURAS``); ``comprimir`` activa la compresión de las respuestas. En el
+    modo cliente, si el cubo serializado pasa de ``maximo_cliente_mb`` se usa el modo servidor.
+    ``metricas`` (un ``RegistroMetricas``) y ``perfilador`` (un ``PerfiladorLento``) son opcionales.
+    """
+    if filtrado not in MODOS_FILTRADO:
+        raise ValueError(f"Modo de filtrado desconocido: '{filtrado}'. Use uno de {MODOS_FILTRADO}.")
+    if figuras not in MODOS_FIGURAS:
+        raise ValueError(f"Modo de figuras desconocido: '{figuras}'. Use uno de {MODOS_FIGURAS}.")
+    if filtrado == "cliente" and not isinstance(instantanea.cubo, CuboAgregado):
+        raise ValueError("El filtrado en el cliente necesita el cubo en memoria (BITACORAS_MOTOR=cubo).")
+    cubo_cliente = None
+    if filtrado == "cliente":
+        cubo_cliente = serializar_cubo(instantanea.cubo, instantanea.clave_cache)
+        if not cubo_en_limite(cubo_cliente, maximo_cliente_mb):
+            logger.warning("Se usa el filtrado en el servidor: el cubo no cabe en el límite del modo cliente.")
+            filtrado, cubo_cliente = "servidor", None
+    fuente = FuenteDatos(instantanea)
+    app = Dash(__name__)
+    app.fuente = fuente
+    app.vigilante = None
+    app.cubo_cliente = None
+    app.figuras_iniciales = None
+    # Bytes por respuesta antes y después de comprimir, en /_bitacoras/respuestas
+    app.medidor_respuestas = instalar_respuestas(app, comprimir_respuestas=comprimir, otras_rutas=("/api/v1/agregados",))
+    if perfilador is not None and metricas is None:
+        metricas = RegistroMetricas()
+    app.metricas = metricas
+    if metricas is not None:
+        # Duración de cada petición al callback y a la API (y su perfil, si hay perfilador) y /metrics
+        ruta_callback = app.config.requests_pathname_prefix.rstrip("/") + "/_dash-update-component"
+        instalar_metricas(app, metricas, rutas=(ruta_callback, "/api/v1/agregados"), perfilador=perfilador)
+    # El layout se arma en cada carga de la página, así el título y los menús siguen a la instantánea vigente
+    app.layout = lambda: crear_layout(app, fuente.actual)
+
+    # Almacén compartido entre procesos detrás de las LRU de figuras y de la API (por defecto el de
+    # BITACORAS_CACHE, SQLite en .cache_bitacoras/)
+    if compartido is None:
+        compartido = crear_almacen()
+    api = crear_api(fuente, compartido, metricas=metricas)
+    app.server.register_blueprint(api)
+    if metricas is not None:
+        metricas.agregar_recolector(metricas_cache(api.cache))
+
+    if filtrado == "cliente":
+        def serializar(nueva):
+            """Serializa el cubo una vez por instantánea; cada sesión lo recibe con el layout."""
+            app.cubo_cliente = serializar_cubo(nueva.cubo, nueva.clave_cache)
+            # Los callbacks ya son del lado del cliente: una instantánea más grande solo se avisa
+            cubo_en_limite(app.cubo_cliente, maximo_cliente_mb)
+
+        app.cubo_cliente = cubo_cliente
+        fuente.suscribir(serializar)
+        app.cache_figuras = None
+
+        # Las cinco gráficas y sus totales se recalculan en el navegador a partir del cubo del Store
+        app.clientside_callback(
+            ClientsideFunction(namespace="bitacoras", function_name="actualizar_graficos"),
+            SALIDAS_TABLERO,
+            ENTRADAS_FILTROS + [State("cubo-cliente", "data")]
+        )
+        # Y los menús en cascada, con las mismas facetas que `CuboAgregado.facetas`
+        app.clientside_callback(
+            ClientsideFunction(namespace="bitacoras", function_name="actualizar_opciones"),
+            SALIDAS_OPCIONES,
+            ENTRADAS_FILTROS + [State("cubo-cliente", "data")]
+        )
+        return app
+
+    # Con figuras ligeras se calculan y se guardan en caché solo los datos de las trazas
+    salidas = trazas_tablero if figuras == "ligeras" else salidas_tablero
+    espacio = "trazas" if figuras == "ligeras" else "figuras"
+
+    def calcular_graficos(categoria, ciclo, tipo_parcela, estado, regimen):
+        """Una consulta al cubo alimenta las cinco gráficas y sus totales.
+
+        Al final va el número de bitácoras filtradas, que se guarda en la caché junto con las salidas
+        para medirlo también en las respuestas servidas desde ella.
+        """
+        cubo = fuente.actual.cubo
+        consulta = cubo.consultar(armar_filtros(categoria, ciclo, tipo_parcela, estado, regimen), metricas=metricas)
+        with cronometro(metricas, "etapa_segundos", AYUDA_ETAPAS, etapa="figuras", espacio=espacio):
+            return (*salidas(consulta), int(consulta.por_anio["Observaciones"].sum()))
+
+    # Caché LRU de las figuras ya serializadas por combinación de filtros; la versión es la clave del CSV
+    # más la configuración de carga, así que ni un archivo de datos distinto ni otro modo de conteo
+    # (BITACORAS_DISTINTOS, BITACORAS_ERROR_HLL, BITACORAS_MOTOR) reutilizan figuras viejas
+    cache_figuras = CacheFiguras(
+        calcular_graficos, capacidad=256, version=instantanea.clave_cache, compartido=compartido, espacio=espacio,
+        metricas=metricas
+    )
+
+    def poner_en_servicio(nueva):
+        """Cambia la versión de la caché y precalienta la vista sin filtros y la de cada Estado, las más consultadas."""
+        if figuras == "ligeras":
+            # Figuras completas que llegan con el layout; las actualizaciones solo cambian sus trazas
+            app.figuras_iniciales = figuras_sin_filtros(nueva.cubo)
+        cache_figuras.invalidar(nueva.clave_cache)
+        cache_figuras.precalentar(combinaciones_comunes({"Estado": nueva.cubo.valores("Estado")}, ["Estado"]))
+
+    poner_en_servicio(instantanea)
+    fuente.suscribir(poner_en_servicio)
+    app.cache_figuras = cache_figuras
+    if metricas is not None:
+        metricas.agregar_recolector(metricas_cache(cache_figuras))
+
+    # Callback único: las cinco gráficas y sus totales salen de la caché (o se calculan y se guardan)
+    @app.callback(SALIDAS_TABLERO, ENTRADAS_FILTROS)
+    def actualizar_graficos(categoria, ciclo, tipo_parcela, estado, regimen):
+        with cronometro(metricas, "callback_segundos", "Duración de los callbacks de Dash", callback="actualizar_graficos"):
+            resultado = cache_figuras.obtener(categoria, ciclo, tipo_parcela, estado, regimen)
+        filas = resultado.pop()
+        if metricas is not None:
+            metricas.observar(
+                "filas_filtradas", filas, "Bitácoras que cumplen los filtros de cada petición (con o sin caché)",
+                cubetas=CUBETAS_CONTEOS
+            )
+        if figuras == "ligeras":
+            for posicion in POSICIONES_FIGURAS:
+                resultado[posicion] = parche_figura(resultado[posicion])
+        return resultado
+
+    # Menús en cascada: cada uno muestra los valores que aún tienen bitácoras con los otros cuatro filtros.
+    # Las facetas salen del índice del cubo (unos pocos milisegundos), así que no pasan por la caché
+    @app.callback(SALIDAS_OPCIONES, ENTRADAS_FILTROS)
+    def actualizar_opciones(categoria, ciclo, tipo_parcela, estado, regimen):
+        with cronometro(metricas, "callback_segundos", "Duración de los callbacks de Dash", callback="actualizar_opciones"):
+            filtros = armar_filtros(categoria, ciclo, tipo_parcela, estado, regimen)
+            return opciones_menus(fuente.actual.cubo.facetas(filtros), filtros)
+
+    return app
+
+
+def iniciar_vigilancia(app, directorio=None, intervalo=None):
+    """Arranca (una sola vez por proceso) el hilo que recarga nuevas instantáneas de ``directorio``.
+
+    Con gunicorn se llama en el maestro desde ``when_ready``, y cada instantánea publicada
+    reinicia los workers con ``HUP`` para que compartan el cubo nuevo (ver ``gunicorn.conf.py``).
+    """
+    directorio = DIRECTORIO_DATOS if directorio is None else directorio
+    if not directorio or (app.vigilante is not None and app.vigilante.is_alive()):
+        return app.vigilante
+    app.vigilante = VigilanteDatos(
+        app.fuente, directorio, intervalo=INTERVALO_REVISION if intervalo is None else intervalo,
+        modo_distintos=MODO_DISTINTOS, error_hll=ERROR_HLL, filas_por_bloque=FILAS_POR_BLOQUE, procesos=PROCESOS,
+        motor=MOTOR
+    )
+    app.vigilante.start()
+    return app.vigilante
+
+
+# Mostrar los mensajes de la carga (p. ej. la memoria antes y después de compactar los datos)
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+# Cargar los datos (limpios y tipados; las cargas siguientes leen la caché Feather en .cache_bitacoras/)
+try:
+    instantanea = cargar_instantanea(
+        ARCHIVO_CSV, modo_distintos=MODO_DISTINTOS, error_hll=ERROR_HLL, filas_por_bloque=FILAS_POR_BLOQUE,
+        procesos=PROCESOS, motor=MOTOR
+    )
+    print("Archivo cargado exitosamente.")
+except FileNotFoundError:
+    print(f"Error: El archivo '{ARCHIVO_CSV}' no se encontró.")
+    sys.exit(1)
+
+app = crear_app(
+    instantanea, filtrado=FILTRADO, figuras=FIGURAS, comprimir=COMPRESION, maximo_cliente_mb=MAXIMO_CLIENTE_MB,
+    metricas=RegistroMetricas() if METRICAS else None,
+    perfilador=PerfiladorLento(DIRECTORIO_PERFIL, UMBRAL_PERFIL) if DIRECTORIO_PERFIL else None
+)
+server = app.server
+
+# Ejecutar la aplicación
+if __name__ == "__main__":
+    iniciar_vigilancia(app)
+    app.run(debug=True, port=8051)
@@ -0,0 +1,279 @@
+// Filtrado en el navegador (modo "cliente" del tablero, ver bitacoras/cliente.py).
+// El cubo llega una vez en el dcc.Store "cubo-cliente"; cada cambio de los menús se resuelve
+// aquí sumando las celdas seleccionadas, sin ir al servidor.
+(function () {
+    const TODOS = "Todos";
+    const COLUMNAS_FILTRO = ["Categoria_Proyecto", "Ciclo", "Tipo_parcela", "Estado", "Tipo_Regimen_Hidrico"];
+    const COLORES_GENERO = {"Masculino": "#2ca02c", "Femenino": "#ff7f0e", "NA..": "#D3D3D3"};
+
+    // Arreglos ya decodificados del último cubo recibido (se decodifica una vez por versión)
+    let cache = {datos: null, arreglos: null};
+
+    function decodificar(texto, Tipo) {
+        const binario = atob(texto);
+        const bytes = new Uint8Array(binario.length);
+        for (let i = 0; i < binario.length; i++) {
+            bytes[i] = binario.charCodeAt(i);
+        }
+        return new Tipo(bytes.buffer);
+    }
+
+    function arreglosDe(datos) {
+        if (cache.datos === datos || (cache.datos && datos.version && cache.datos.version === datos.version)) {
+            return cache.arreglos;
+        }
+        const arreglos = {
+            anios: decodificar(datos.anios, Int32Array),
+            observaciones: decodificar(datos.observaciones, Int32Array),
+            area: decodificar(datos.area, Float64Array),
+            codigos: {},
+            generos: datos.generos ? decodificar(datos.generos.conteos, Int32Array) : null,
+            distintos: {}
+        };
+        COLUMNAS_FILTRO.forEach(function (columna) {
+            arreglos.codigos[columna] = decodificar(datos.codigos[columna], Int32Array);
+        });
+        Object.keys(datos.distintos).forEach(function (columna) {
+            const distintos = datos.distintos[columna];
+            arreglos.distintos[columna] = {
+                modo: distintos.modo,
+                n_valores: distintos.n_valores,
+                precision: distintos.precision,
+                punteros: decodificar(distintos.punteros, Int32Array),
+                valores: distintos.modo === "exacto"
+                    ? decodificar(distintos.codigos, Int32Array)
+                    : decodificar(distintos.entradas, Uint32Array)
+            };
+        });
+        cache = {datos: datos, arreglos: arreglos};
+        return arreglos;
+    }
+
+    // Posiciones de las celdas que cumplen los filtros (en orden, es decir, agrupadas por año)
+    function seleccionarCeldas(datos, arreglos, filtros) {
+        const condiciones = [];
+        for (let i = 0; i < COLUMNAS_FILTRO.length; i++) {
+            const columna = COLUMNAS_FILTRO[i];
+            if (filtros[i] === TODOS) {
+                continue;
+            }
+            // Un valor que no existe en el cubo (o un menú vacío) no selecciona ninguna celda
+            condiciones.push([arreglos.codigos[columna], datos.dimensiones[columna].indexOf(filtros[i])]);
+        }
+        const celdas = [];
+        for (let celda = 0; celda < datos.n_celdas; celda++) {
+            let cumple = true;
+            for (let j = 0; j < condiciones.length && cumple; j++) {
+                cumple = condiciones[j][0][celda] === condiciones[j][1];
+            }
+            if (cumple) {
+                celdas.push(celda);
+            }
+        }
+        return celdas;
+    }
+
+    // Estimación HyperLogLog de un sketch, igual que SketchesHLL.estimar
+    function estimarHLL(registros) {
+        const m = registros.length;
+        const alfa = 0.7213 / (1 + 1.079 / m);
+        let suma = 0;
+        let ceros = 0;
+        for (let i = 0; i < m; i++) {
+            suma += Math.pow(2, -registros[i]);
+            if (registros[i] === 0) {
+                ceros++;
+            }
+        }
+        let estimacion = alfa * m * m / suma;
+        if (estimacion <= 2.5 * m && ceros > 0) {
+            estimacion = m * Math.log(m / ceros);
+        }
+        return Math.round(estimacion);
+    }
+
+    // Valores distintos por grupo (año) y en total, para las celdas seleccionadas
+    function contarDistintos(distintos, celdas, grupos, nGrupos) {
+        const porGrupo = new Array(nGrupos).fill(0);
+        if (distintos.modo === "exacto") {
+            // Marca de grupo por valor: como los grupos son contiguos, basta con recordar el último
+            const ultimoGrupo = new Int32Array(distintos.n_valores).fill(-1);
+            const vistos = new Uint8Array(distintos.n_valores);
+            let total = 0;
+            celdas.forEach(function (celda, i) {
+                for (let k = distintos.punteros[celda]; k < distintos.punteros[celda + 1]; k++) {
+                    const codigo = distintos.valores[k];
+                    if (ultimoGrupo[codigo] !== grupos[i]) {
+                        ultimoGrupo[codigo] = grupos[i];
+                        porGrupo[grupos[i]]++;
+                    }
+                    if (!vistos[codigo]) {
+                        vistos[codigo] = 1;
+                        total++;
+                    }
+                }
+            });
+            return [porGrupo, total];
+        }
+        const m = 1 << distintos.precision;
+        const sketches = [];
+        for (let g = 0; g < nGrupos; g++) {
+            sketches.push(new Uint8Array(m));
+        }
+        celdas.forEach(function (celda, i) {
+            const sketch = sketches[grupos[i]];
+            for (let k = distintos.punteros[celda]; k < distintos.punteros[celda + 1]; k++) {
+                const registro = distintos.valores[k] >>> 6;
+                const rango = distintos.valores[k] & 63;
+                if (rango > sketch[registro]) {
+                    sketch[registro] = rango;
+                }
+            }
+        });
+        const total = new Uint8Array(m);
+        sketches.forEach(function (sketch, g) {
+            porGrupo[g] = estimarHLL(sketch);
+            for (let r = 0; r < m; r++) {
+                if (sketch[r] > total[r]) {
+                    total[r] = sketch[r];
+                }
+            }
+        });
+        return [porGrupo, celdas.length ? estimarHLL(total) : 0];
+    }
+
+    function copiar(figura) {
+        return JSON.parse(JSON.stringify(figura));
+    }
+
+    function graficoBarras(plantilla, x, y) {
+        const figura = copiar(plantilla);
+        figura.data[0].x = x;
+        figura.data[0].y = y;
+        return figura;
+    }
+
+    function formatearArea(total) {
+        return total.toFixed(2);
+    }
+
+    function actualizarGraficos(categoria, ciclo, tipoParcela, estado, regimen, datos) {
+        if (!datos) {
+            return window.dash_clientside.no_update;
+        }
+        const arreglos = arreglosDe(datos);
+        const celdas = seleccionarCeldas(datos, arreglos, [categoria, ciclo, tipoParcela, estado, regimen]);
+
+        // Totales por año (las celdas vienen ordenadas por año)
+        const anios = [];
+        const observaciones = [];
+        const area = [];
+        const grupos = new Int32Array(celdas.length);
+        celdas.forEach(function (celda, i) {
+            const anio = arreglos.anios[celda];
+            if (anios.length === 0 || anios[anios.length - 1] !== anio) {
+                anios.push(anio);
+                observaciones.push(0);
+                area.push(0);
+            }
+            const g = anios.length - 1;
+            grupos[i] = g;
+            observaciones[g] += arreglos.observaciones[celda];
+            area[g] += arreglos.area[celda];
+        });
+
+        const parcelas = contarDistintos(arreglos.distintos["Id_Parcela(Unico)"], celdas, grupos, anios.length);
+        const productores = contarDistintos(arreglos.distintos["Id_Productor"], celdas, grupos, anios.length);
+        const totalObservaciones = observaciones.reduce(function (a, b) { return a + b; }, 0);
+        const totalArea = area.reduce(function (a, b) { return a + b; }, 0);
+
+        let genero = {};
+        if (datos.generos) {
+            const nombres = datos.generos.nombres;
+            const registros = new Array(nombres.length).fill(0);
+            celdas.forEach(function (celda) {
+                for (let j = 0; j < nombres.length; j++) {
+                    registros[j] += arreglos.generos[celda * nombres.length + j];
+                }
+            });
+            const etiquetas = [];
+            const conteos = [];
+            nombres.forEach(function (nombre, j) {
+                if (registros[j] > 0) {
+                    etiquetas.push(nombre);
+                    conteos.push(registros[j]);
+                }
+            });
+            const suma = conteos.reduce(function (a, b) { return a + b; }, 0);
+            genero = copiar(datos.figuras[4]);
+            genero.data[0].labels = etiquetas;
+            genero.data[0].values = conteos.map(function (conteo) { return conteo / suma * 100; });
+            genero.data[0].marker = Object.assign({}, genero.data[0].marker, {
+                colors: etiquetas.map(function (etiqueta) { return COLORES_GENERO[etiqueta] || "#7f7f7f"; })
+            });
+        }
+
+        return [
+            graficoBarras(datos.figuras[0], anios, observaciones), "Total de Bitácoras: " + totalObservaciones,
+            graficoBarras(datos.figuras[1], anios, area), "Total de Área (ha): " + formatearArea(totalArea),
+            graficoBarras(datos.figuras[2], anios, parcelas[0]), "Total de Parcelas: " + parcelas[1],
+            graficoBarras(datos.figuras[3], anios, productores[0]), "Total de Productores: " + productores[1],
+            genero
+        ];
+    }
+
+    function formatearConteo(conteo) {
+        return conteo.toLocaleString("en-US");
+    }
+
+    // Opciones de los cinco menús en cascada, igual que opciones_menus(cubo.facetas(filtros)): para cada
+    // menú, bitácoras por valor con los filtros de los otros cuatro; se omiten los valores en cero salvo
+    // el seleccionado
+    function actualizarOpciones(categoria, ciclo, tipoParcela, estado, regimen, datos) {
+        if (!datos) {
+            return window.dash_clientside.no_update;
+        }
+        const arreglos = arreglosDe(datos);
+        const filtros = [categoria, ciclo, tipoParcela, estado, regimen];
+        const seleccionados = COLUMNAS_FILTRO.map(function (columna, i) {
+            return filtros[i] === TODOS ? -2 : datos.dimensiones[columna].indexOf(filtros[i]);
+        });
+        const conteos = COLUMNAS_FILTRO.map(function (columna) {
+            return new Float64Array(datos.dimensiones[columna].length);
+        });
+        for (let celda = 0; celda < datos.n_celdas; celda++) {
+            // Filtros que la celda no cumple: con dos o más no cuenta en ningún menú, con uno solo
+            // cuenta únicamente en el menú de ese filtro
+            let fallas = 0;
+            let falla = -1;
+            for (let i = 0; i < COLUMNAS_FILTRO.length && fallas < 2; i++) {
+                if (seleccionados[i] !== -2 && arreglos.codigos[COLUMNAS_FILTRO[i]][celda] !== seleccionados[i]) {
+                    fallas++;
+                    falla = i;
+                }
+            }
+            if (fallas > 1) {
+                continue;
+            }
+            for (let i = 0; i < COLUMNAS_FILTRO.length; i++) {
+                if (fallas === 0 || falla === i) {
+                    conteos[i][arreglos.codigos[COLUMNAS_FILTRO[i]][celda]] += arreglos.observaciones[celda];
+                }
+            }
+        }
+        return COLUMNAS_FILTRO.map(function (columna, i) {
+            const total = conteos[i].reduce(function (a, b) { return a + b; }, 0);
+            const opciones = [{label: TODOS + " (" + formatearConteo(total) + ")", value: TODOS}];
+            datos.dimensiones[columna].forEach(function (valor, codigo) {
+                if (conteos[i][codigo] > 0 || valor === filtros[i]) {
+                    opciones.push({label: valor + " (" + formatearConteo(conteos[i][codigo]) + ")", value: valor});
+                }
+            });
+            return opciones;
+        });
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        bitacoras: {actualizar_graficos: actualizarGraficos, actualizar_opciones: actualizarOpciones}
+    });
+})();
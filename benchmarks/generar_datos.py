@@ -0,0 +1,149 @@
+"""Generador de CSVs sintéticos con la forma de Datos_Historicos, para medir el tablero sin los datos reales.
+
+Uso::
+
+    python benchmarks/generar_datos.py 10k 1M 10M
+    python benchmarks/generar_datos.py 250000 --directorio /tmp/datos --semilla 7
+
+Las columnas que usan los tableros siguen una distribución parecida a la real: cada
+parcela pertenece a un productor y a un estado y tiene un tipo, un régimen hídrico y un
+área típica, y aparece en varios años (una bitácora por parcela, año y ciclo); los
+estados y las categorías no son uniformes; los registros crecen con los años; hay nulos,
+áreas no numéricas y años fuera del rango de los tableros. Se agregan columnas que los
+tableros no usan, como en el export real. El archivo se escribe por bloques, así que
+generar 10M de filas no necesita tenerlas todas en memoria.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Tamaños con nombre que aceptan el generador y el arnés de medición
+TAMANOS = {"10k": 10_000, "1M": 1_000_000, "10M": 10_000_000}
+
+DIRECTORIO_DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos")
+
+ESTADOS = [
+    "Guanajuato", "Jalisco", "Chiapas", "Oaxaca", "México", "Puebla", "Hidalgo", "Michoacán", "Veracruz",
+    "Sinaloa", "Sonora", "Tlaxcala", "Querétaro", "Campeche", "Yucatán", "Morelos", "Guerrero", "Zacatecas",
+    "Chihuahua", "Tamaulipas", "Durango", "Nayarit", "Quintana Roo", "Tabasco", "San Luis Potosí",
+    "Aguascalientes", "Coahuila", "Nuevo León", "Baja California", "Baja California Sur", "Colima", "Ciudad de México",
+]
+CATEGORIAS = ["Modulo", "Plataforma", "Area de extension", "Area de impacto", "Parcela demostrativa"]
+CICLOS = ["PV", "OI", "Anual", "Perenne"]
+TIPOS_PARCELA = ["Area de impacto", "Area de extension", "Modulo", "Testigo"]
+REGIMENES = ["Temporal", "Riego", "Punta de riego", "Humedad residual"]
+GENEROS = ["Masculino", "Femenino", "NA.."]
+CULTIVOS = ["Maíz", "Frijol", "Trigo", "Sorgo", "Cebada", "Avena", "Arroz", "Haba"]
+
+# Años del export (2010-2011 y 2026 quedan fuera del rango de los tableros) y su peso relativo
+ANIOS = np.arange(2010, 2027)
+PESOS_ANIOS = np.linspace(1.0, 6.0, len(ANIOS)) ** 1.5
+
+# Bitácoras por parcela (en promedio) y parcelas por productor
+BITACORAS_POR_PARCELA = 4
+PARCELAS_POR_PRODUCTOR = 1.5
+
+
+def filas_de(tamano):
+    """Número de filas de un tamaño con nombre ("10k", "1M", "10M") o de un entero."""
+    return TAMANOS[tamano] if tamano in TAMANOS else int(tamano)
+
+
+def ruta_de(tamano, directorio=DIRECTORIO_DATOS):
+    """Ruta del CSV sintético de un tamaño; la fecha de corte del nombre fija el último año en 2025."""
+    return os.path.join(directorio, f"Datos_Historicos_sintetico_{tamano}_al31122025.csv")
+
+
+def _pesos_zipf(n, exponente=1.0):
+    pesos = 1.0 / np.arange(1, n + 1) ** exponente
+    return pesos / pesos.sum()
+
+
+def _con_nulos(rng, valores, proporcion):
+    valores = valores.astype(object)
+    valores[rng.random(len(valores)) < proporcion] = None
+    return valores
+
+
+def generar(filas, archivo, semilla=2025, filas_por_bloque=500_000):
+    """Escribe ``filas`` bitácoras sintéticas en ``archivo`` y devuelve su ruta."""
+    rng = np.random.default_rng(semilla)
+    n_parcelas = max(filas // BITACORAS_POR_PARCELA, 1)
+    n_productores = max(int(n_parcelas / PARCELAS_POR_PRODUCTOR), 1)
+
+    # Atributos fijos de cada productor y de cada parcela
+    estado_productor = rng.choice(len(ESTADOS), n_productores, p=_pesos_zipf(len(ESTADOS), 0.8))
+    genero_productor = rng.choice(len(GENEROS), n_productores, p=[0.68, 0.27, 0.05])
+    productor_parcela = rng.integers(0, n_productores, n_parcelas)
+    tipo_parcela = rng.choice(len(TIPOS_PARCELA), n_parcelas, p=[0.55, 0.3, 0.1, 0.05])
+    regimen_parcela = rng.choice(len(REGIMENES), n_parcelas, p=[0.6, 0.25, 0.1, 0.05])
+    categoria_parcela = rng.choice(len(CATEGORIAS), n_parcelas, p=[0.35, 0.25, 0.2, 0.15, 0.05])
+    area_parcela = np.round(rng.lognormal(mean=0.3, sigma=0.9, size=n_parcelas), 2)
+
+    os.makedirs(os.path.dirname(os.path.abspath(archivo)), exist_ok=True)
+    temporal = archivo + ".tmp"
+    with open(temporal, "w", encoding="utf-8", newline="") as f:
+        for inicio in range(0, filas, filas_por_bloque):
+            n = min(filas_por_bloque, filas - inicio)
+            # Las parcelas más antiguas tienen más bitácoras
+            parcela = np.minimum((rng.pareto(1.2, n) * n_parcelas / 8).astype(np.int64), n_parcelas - 1)
+            parcela = (parcela + rng.integers(0, n_parcelas, n) * (rng.random(n) < 0.5)) % n_parcelas
+            productor = productor_parcela[parcela]
+
+            area = np.round(area_parcela[parcela] * rng.uniform(0.8, 1.2, n), 2).astype(object)
+            faltante = rng.random(n)
+            area[faltante < 0.004] = None
+            area[(faltante >= 0.004) & (faltante < 0.006)] = "s/d"
+
+            bloque = pd.DataFrame({
+                "Id_Bitacora": np.arange(inicio, inicio + n),
+                "Anio": rng.choice(ANIOS, n, p=PESOS_ANIOS / PESOS_ANIOS.sum()),
+                "Categoria_Proyecto": _con_nulos(rng, np.array(CATEGORIAS)[categoria_parcela[parcela]], 0.01),
+                "Ciclo": rng.choice(CICLOS, n, p=[0.6, 0.3, 0.07, 0.03]),
+                "Cultivo": rng.choice(CULTIVOS, n, p=_pesos_zipf(len(CULTIVOS), 1.3)),
+                "Estado": np.array(ESTADOS)[estado_productor[productor]],
+                "Tipo_Regimen_Hidrico": _con_nulos(rng, np.array(REGIMENES)[regimen_parcela[parcela]], 0.02),
+                "Tipo_parcela": np.array(TIPOS_PARCELA)[tipo_parcela[parcela]],
+                "Area_total_de_la_parcela(ha)": area,
+                "Rendimiento(t/ha)": np.round(rng.gamma(2.0, 1.6, n), 3),
+                "Id_Parcela(Unico)": np.char.mod("PA%08d", parcela),
+                "Id_Productor": np.char.mod("PR%07d", productor),
+                "Genero": _con_nulos(rng, np.array(GENEROS)[genero_productor[productor]], 0.01),
+            })
+            bloque.to_csv(f, header=inicio == 0, index=False)
+    os.replace(temporal, archivo)
+    return archivo
+
+
+def asegurar(tamano, directorio=DIRECTORIO_DATOS, semilla=2025):
+    """Ruta del CSV de un tamaño, generándolo si todavía no existe."""
+    archivo = ruta_de(tamano, directorio)
+    if not os.path.exists(archivo):
+        generar(filas_de(tamano), archivo, semilla)
+    return archivo
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("tamanos", nargs="*", default=["10k", "1M"], help="10k, 1M, 10M o un número de filas")
+    parser.add_argument("--directorio", default=DIRECTORIO_DATOS)
+    parser.add_argument("--semilla", type=int, default=2025)
+    parser.add_argument("--reemplazar", action="store_true", help="volver a generar aunque el archivo exista")
+    opciones = parser.parse_args(argumentos)
+    for tamano in opciones.tamanos:
+        archivo = ruta_de(tamano, opciones.directorio)
+        if os.path.exists(archivo) and not opciones.reemplazar:
+            print(f"{archivo} ya existe")
+            continue
+        inicio = time.perf_counter()
+        generar(filas_de(tamano), archivo, opciones.semilla)
+        print(f"{archivo}: {filas_de(tamano)} filas en {time.perf_counter() - inicio:.1f} s "
+              f"({os.path.getsize(archivo) / 1e6:.0f} MB)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,386 @@
+"""Arnés de medición de la carga de datos y del callback del tablero.
+
+Uso::
+
+    python benchmarks/medir.py                      # 10k y 1M, resultados en benchmarks/resultados/
+    python benchmarks/medir.py 10k 1M 10M --distintos aproximado
+    python benchmarks/medir.py 10k --comparar benchmarks/resultados/anterior.json
+
+Para cada tamaño (los CSV sintéticos se generan con ``generar_datos`` si no existen) mide:
+
+- Carga: lectura del CSV, limpieza, compactación, escritura y lectura de la caché Feather,
+  construcción del cubo y carga por bloques.
+- Memoria: pico de memoria residente de cada camino de carga, cada uno en un proceso nuevo.
+- Callback: consulta al cubo, cada una de las cinco gráficas, la serialización de las
+  salidas (completas y ligeras) y la petición completa a ``/_dash-update-component``, con y
+  sin caché, sobre una matriz de combinaciones de filtros (``Todos`` y los valores más
+  frecuentes de cada menú).
+
+Los tiempos se guardan en milisegundos (mínimo, mediana, p95, máximo) en un JSON con la
+versión del código (``git describe``) y del entorno, para comparar corridas entre versiones.
+"""
+import argparse
+import datetime
+import gc
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from plotly.io.json import to_json_plotly  # noqa: E402
+
+from benchmarks.generar_datos import asegurar, filas_de  # noqa: E402
+from bitacoras import (  # noqa: E402
+    TODOS,
+    CuboAgregado,
+    anio_final,
+    armar_filtros,
+    cargar_datos,
+    cargar_instantanea,
+    compactar_datos,
+    leer_csv,
+    limpiar_datos,
+)
+from bitacoras.carga import FILAS_POR_BLOQUE  # noqa: E402
+from bitacoras.esquema import ANIO_INICIO  # noqa: E402
+from bitacoras.figuras import (  # noqa: E402
+    grafico_area,
+    grafico_genero,
+    grafico_observaciones,
+    grafico_parcelas,
+    grafico_productores,
+    opciones_menus,
+    salidas_tablero,
+    trazas_tablero,
+)
+
+DIRECTORIO_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+
+GRAFICOS = {
+    "grafico_observaciones": grafico_observaciones,
+    "grafico_area": grafico_area,
+    "grafico_parcelas": grafico_parcelas,
+    "grafico_productores": grafico_productores,
+    "grafico_genero": grafico_genero,
+}
+
+# Orden de los menús en el callback del tablero (el de `armar_filtros`)
+MENUS = ["Categoria_Proyecto", "Ciclo", "Tipo_parcela", "Estado", "Tipo_Regimen_Hidrico"]
+
+
+def resumir(tiempos):
+    """Mínimo, mediana, p95 y máximo de una lista de tiempos en segundos, en milisegundos."""
+    ordenados = sorted(tiempos)
+    p95 = ordenados[min(len(ordenados) - 1, int(np.ceil(0.95 * len(ordenados))) - 1)]
+    return {
+        "n": len(ordenados),
+        "min_ms": ordenados[0] * 1e3,
+        "mediana_ms": statistics.median(ordenados) * 1e3,
+        "p95_ms": p95 * 1e3,
+        "max_ms": ordenados[-1] * 1e3,
+    }
+
+
+def cronometrar(funcion, *argumentos, **opciones):
+    """Ejecuta ``funcion`` una vez y devuelve ``(resultado, segundos)``."""
+    gc.collect()
+    inicio = time.perf_counter()
+    resultado = funcion(*argumentos, **opciones)
+    return resultado, time.perf_counter() - inicio
+
+
+def version_codigo():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocida"
+
+
+# --- Carga -----------------------------------------------------------------------------------------
+
+def medir_carga(archivo, repeticiones, modo_distintos):
+    """Tiempos de cada etapa de la carga; devuelve también el cubo para medir los callbacks."""
+    tiempos = {etapa: [] for etapa in (
+        "leer_csv", "limpiar", "compactar", "escribir_feather", "leer_feather", "construir_cubo", "carga_por_bloques",
+    )}
+    with tempfile.TemporaryDirectory() as directorio_cache:
+        for _ in range(repeticiones):
+            datos, segundos = cronometrar(leer_csv, archivo)
+            tiempos["leer_csv"].append(segundos)
+            datos, segundos = cronometrar(limpiar_datos, datos, ANIO_INICIO, anio_final(archivo))
+            tiempos["limpiar"].append(segundos)
+            datos, segundos = cronometrar(compactar_datos, datos)
+            tiempos["compactar"].append(segundos)
+            del datos
+
+            for nombre in os.listdir(directorio_cache):
+                os.remove(os.path.join(directorio_cache, nombre))
+            # La primera carga con caché lee el CSV y escribe el Feather; la segunda solo lee el Feather
+            _, segundos = cronometrar(cargar_datos, archivo, directorio_cache)
+            tiempos["escribir_feather"].append(segundos)
+            datos, segundos = cronometrar(cargar_datos, archivo, directorio_cache)
+            tiempos["leer_feather"].append(segundos)
+
+            cubo, segundos = cronometrar(CuboAgregado.construir, datos, modo_distintos)
+            tiempos["construir_cubo"].append(segundos)
+            del datos
+
+            _, segundos = cronometrar(
+                lambda: cargar_instantanea(archivo, modo_distintos=modo_distintos, filas_por_bloque=FILAS_POR_BLOQUE)
+            )
+            tiempos["carga_por_bloques"].append(segundos)
+    return {etapa: resumir(lista) for etapa, lista in tiempos.items()}, cubo
+
+
+def memoria_proceso():
+    """Memoria residente actual y pico del proceso, en MB (``/proc/self/status``; en otros sistemas el pico de ``getrusage``)."""
+    try:
+        with open("/proc/self/status") as f:
+            campos = dict(linea.split(":", 1) for linea in f if linea.startswith(("VmRSS", "VmHWM")))
+        return int(campos["VmRSS"].split()[0]) / 1024, int(campos["VmHWM"].split()[0]) / 1024
+    except OSError:
+        # ru_maxrss está en KiB en Linux y en bytes en macOS
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024)
+        return pico, pico
+
+
+def _carga_en_proceso(camino, archivo, modo_distintos, directorio_cache, cola):
+    """Cuerpo del proceso que mide la memoria de un camino de carga."""
+    # Las importaciones dejan un pico propio; en Linux se reinicia para medir solo la carga
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+    base, _ = memoria_proceso()
+    if camino == "completa":
+        datos = compactar_datos(limpiar_datos(leer_csv(archivo), anio_fin=anio_final(archivo)))
+        CuboAgregado.construir(datos, modo_distintos)
+    elif camino == "feather":
+        CuboAgregado.construir(cargar_datos(archivo, directorio_cache), modo_distintos)
+    else:
+        cargar_instantanea(archivo, modo_distintos=modo_distintos, filas_por_bloque=FILAS_POR_BLOQUE)
+    cola.put((base, memoria_proceso()[1]))
+
+
+def medir_memoria(archivo, modo_distintos):
+    """Pico de memoria residente (MB) de cada camino de carga, cada uno en un proceso nuevo (``spawn``)."""
+    contexto = multiprocessing.get_context("spawn")
+    resultados = {}
+    with tempfile.TemporaryDirectory() as directorio_cache:
+        cargar_datos(archivo, directorio_cache)
+        for camino in ("completa", "feather", "por_bloques"):
+            cola = contexto.Queue()
+            proceso = contexto.Process(
+                target=_carga_en_proceso, args=(camino, archivo, modo_distintos, directorio_cache, cola)
+            )
+            proceso.start()
+            base, pico = cola.get()
+            proceso.join()
+            resultados[camino] = {"pico_mb": pico, "inicial_mb": base, "carga_mb": pico - base}
+    return resultados
+
+
+# --- Callback --------------------------------------------------------------------------------------
+
+def combinaciones_filtros(cubo, valores_por_filtro=2, maximo=64, semilla=0):
+    """Combinaciones de los cinco menús con "Todos" y los valores más frecuentes de cada uno.
+
+    Si son más de ``maximo`` se toma una muestra fija, que siempre incluye la vista sin filtros.
+    """
+    opciones = []
+    for menu in MENUS:
+        frecuentes = cubo.celdas.groupby(menu, observed=True)["Observaciones"].sum().nlargest(valores_por_filtro)
+        opciones.append([TODOS] + [str(valor) for valor in frecuentes.index])
+    combinaciones = list(itertools.product(*opciones))
+    if len(combinaciones) > maximo:
+        combinaciones = [combinaciones[0]] + random.Random(semilla).sample(combinaciones[1:], maximo - 1)
+    return combinaciones
+
+
+def medir_callbacks(cubo, combinaciones):
+    """Tiempos por combinación de la consulta, de cada gráfica, de la serialización de las salidas y de
+    las opciones de los menús en cascada (facetas)."""
+    tiempos = {"consultar": [], **{nombre: [] for nombre in GRAFICOS}, "salidas_tablero": [],
+               "serializar_completas": [], "serializar_ligeras": [], "opciones_menus": []}
+    por_filtros_activos = {}
+    bytes_salidas = {"completas": [], "ligeras": []}
+    for combinacion in combinaciones:
+        consulta, segundos = cronometrar(cubo.consultar, armar_filtros(*combinacion))
+        tiempos["consultar"].append(segundos)
+        for nombre, grafico in GRAFICOS.items():
+            tiempos[nombre].append(cronometrar(grafico, consulta)[1])
+
+        salidas, segundos = cronometrar(salidas_tablero, consulta)
+        tiempos["salidas_tablero"].append(segundos)
+        activos = sum(valor != TODOS for valor in combinacion)
+        por_filtros_activos.setdefault(activos, []).append(tiempos["consultar"][-1] + segundos)
+
+        texto, segundos = cronometrar(to_json_plotly, salidas)
+        tiempos["serializar_completas"].append(segundos)
+        bytes_salidas["completas"].append(len(texto))
+        texto, segundos = cronometrar(lambda: to_json_plotly(trazas_tablero(consulta)))
+        tiempos["serializar_ligeras"].append(segundos)
+        bytes_salidas["ligeras"].append(len(texto))
+
+        filtros = armar_filtros(*combinacion)
+        tiempos["opciones_menus"].append(cronometrar(lambda: opciones_menus(cubo.facetas(filtros), filtros))[1])
+
+    resultado = {etapa: resumir(lista) for etapa, lista in tiempos.items()}
+    resultado["consulta_y_salidas_por_filtros_activos"] = {
+        str(activos): resumir(lista) for activos, lista in sorted(por_filtros_activos.items())
+    }
+    resultado["bytes_salidas"] = {modo: int(statistics.median(lista)) for modo, lista in bytes_salidas.items()}
+    return resultado
+
+
+def _importar_app(archivo):
+    """Importa ``app`` (que carga su CSV al importarse) apuntándolo a un archivo de la medición y sin caché compartida."""
+    os.environ["BITACORAS_CSV"] = archivo
+    os.environ["BITACORAS_CACHE"] = "ninguno"
+    import app as modulo_app
+
+    return modulo_app
+
+
+def medir_peticiones(modulo_app, instantanea, combinaciones, figuras="completas"):
+    """Tiempos de la petición completa al callback (Flask + Dash + caché), la primera vez y repetida."""
+    app = modulo_app.crear_app(instantanea, figuras=figuras)
+    cliente = app.server.test_client()
+    ids = ["categoria-dropdown", "ciclo-dropdown", "tipo-parcela-dropdown", "estado-dropdown", "regimen-dropdown"]
+    salidas = [(salida.component_id, salida.component_property) for salida in modulo_app.SALIDAS_TABLERO]
+    tiempos = {"peticion": [], "peticion_en_cache": []}
+    for combinacion in combinaciones:
+        cuerpo = {
+            "output": ".." + "...".join(f"{componente}.{propiedad}" for componente, propiedad in salidas) + "..",
+            "outputs": [{"id": componente, "property": propiedad} for componente, propiedad in salidas],
+            "inputs": [{"id": id_, "property": "value", "value": valor} for id_, valor in zip(ids, combinacion)],
+            "changedPropIds": [f"{ids[0]}.value"],
+            "state": [],
+        }
+        for etapa in tiempos:
+            respuesta, segundos = cronometrar(cliente.post, "/_dash-update-component", json=cuerpo)
+            if respuesta.status_code != 200:
+                raise RuntimeError(f"El callback respondió {respuesta.status_code}: {respuesta.data[:200]!r}")
+            tiempos[etapa].append(segundos)
+    return {etapa: resumir(lista) for etapa, lista in tiempos.items()}
+
+
+# --- Corrida ---------------------------------------------------------------------------------------
+
+def medir_tamano(tamano, opciones, modulo_app):
+    archivo = asegurar(tamano, opciones.directorio)
+    print(f"== {tamano}: {archivo}", flush=True)
+    resultado = {"archivo": os.path.basename(archivo), "filas": filas_de(tamano), "bytes": os.path.getsize(archivo)}
+
+    resultado["carga"], cubo = medir_carga(archivo, opciones.repeticiones, opciones.distintos)
+    resultado["celdas_cubo"] = len(cubo.celdas)
+    resultado["memoria_cubo_mb"] = cubo.memoria_mb()
+    print(f"   carga: {resultado['carga']['leer_csv']['mediana_ms']:.0f} ms lectura, "
+          f"{resultado['carga']['construir_cubo']['mediana_ms']:.0f} ms cubo", flush=True)
+    if not opciones.sin_memoria:
+        resultado["memoria"] = medir_memoria(archivo, opciones.distintos)
+        print("   memoria: " + ", ".join(f"{camino} {valores['pico_mb']:.0f} MB"
+                                         for camino, valores in resultado["memoria"].items()), flush=True)
+
+    combinaciones = combinaciones_filtros(cubo, opciones.valores_por_filtro, opciones.combinaciones)
+    resultado["combinaciones"] = len(combinaciones)
+    resultado["callback"] = medir_callbacks(cubo, combinaciones)
+    print(f"   callback: {resultado['callback']['salidas_tablero']['mediana_ms']:.1f} ms gráficas, "
+          f"{resultado['callback']['serializar_completas']['mediana_ms']:.1f} ms serialización", flush=True)
+    if modulo_app is not None:
+        instantanea = cargar_instantanea(archivo, modo_distintos=opciones.distintos, filas_por_bloque=FILAS_POR_BLOQUE)
+        resultado["peticiones"] = {
+            figuras: medir_peticiones(modulo_app, instantanea, combinaciones, figuras) for figuras in ("completas", "ligeras")
+        }
+        print(f"   petición: {resultado['peticiones']['completas']['peticion']['mediana_ms']:.1f} ms", flush=True)
+    return resultado
+
+
+def comparar(anterior, actual):
+    """Imprime la razón actual/anterior de la mediana de cada etapa común a las dos corridas."""
+    def medianas(resultado, prefijo=""):
+        for clave, valor in resultado.items():
+            if isinstance(valor, dict) and "mediana_ms" in valor:
+                yield prefijo + clave, valor["mediana_ms"]
+            elif isinstance(valor, dict):
+                yield from medianas(valor, f"{prefijo}{clave}.")
+
+    print(f"\nComparación con {anterior['version']} (actual {actual['version']}); razón de medianas:")
+    for tamano, resultado in actual["tamanos"].items():
+        if tamano not in anterior["tamanos"]:
+            continue
+        previas = dict(medianas(anterior["tamanos"][tamano]))
+        for etapa, mediana in medianas(resultado):
+            if previas.get(etapa):
+                razon = mediana / previas[etapa]
+                marca = "  <-- más lento" if razon > 1.2 else ""
+                print(f"  {tamano:>6} {etapa:<60} {previas[etapa]:10.2f} -> {mediana:10.2f} ms  x{razon:.2f}{marca}")
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("tamanos", nargs="*", default=["10k", "1M"], help="10k, 1M, 10M o un número de filas")
+    parser.add_argument("--directorio", default=os.path.join(RAIZ, "benchmarks", "datos"), help="dónde están (o se generan) los CSV")
+    parser.add_argument("--distintos", choices=["exacto", "aproximado"], default="exacto")
+    parser.add_argument("--repeticiones", type=int, default=3, help="repeticiones de la carga")
+    parser.add_argument("--valores-por-filtro", type=int, default=2)
+    parser.add_argument("--combinaciones", type=int, default=64, help="máximo de combinaciones de filtros")
+    parser.add_argument("--sin-memoria", action="store_true", help="no medir la memoria (evita cargar cada archivo otra vez)")
+    parser.add_argument("--sin-dash", action="store_true", help="no medir las peticiones al servidor de Dash")
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto en benchmarks/resultados/)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para comparar")
+    opciones = parser.parse_args(argumentos)
+
+    version = version_codigo()
+    resultados = {
+        "version": version,
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "entorno": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "plataforma": platform.platform(),
+            "procesadores": os.cpu_count(),
+        },
+        "opciones": {"distintos": opciones.distintos, "repeticiones": opciones.repeticiones,
+                     "valores_por_filtro": opciones.valores_por_filtro, "filas_por_bloque": FILAS_POR_BLOQUE},
+        "tamanos": {},
+    }
+    modulo_app = None
+    if not opciones.sin_dash:
+        # La app se importa una sola vez, con el archivo más chico; cada tamaño crea su propia app
+        modulo_app = _importar_app(asegurar(min(opciones.tamanos, key=filas_de), opciones.directorio))
+    for tamano in opciones.tamanos:
+        resultados["tamanos"][tamano] = medir_tamano(tamano, opciones, modulo_app)
+
+    salida = opciones.salida or os.path.join(
+        DIRECTORIO_RESULTADOS, f"{datetime.date.today():%Y%m%d}_{version}_{opciones.distintos}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f"Resultados en {salida}")
+
+    if opciones.comparar:
+        with open(opciones.comparar, encoding="utf-8") as f:
+            comparar(json.load(f), resultados)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""Capa de datos compartida por los tableros de Bitácoras Agronómicas."""
+from .almacenes import AlmacenArchivos, AlmacenCache, AlmacenRedis, AlmacenSQLite, crear_almacen
+from .cache import CacheFiguras, combinaciones_comunes
+from .carga import (
+    anio_final,
+    cargar_datos,
+    clave_archivo,
+    compactar_datos,
+    fecha_instantanea,
+    leer_csv,
+    leer_csv_por_bloques,
+    leer_encabezado,
+    limpiar_datos,
+    memoria_mb,
+    validar_columnas,
+)
+from .esquema import (
+    ANIO_FIN,
+    ANIO_INICIO,
+    COLUMNA_ANIO,
+    COLUMNA_AREA,
+    COLUMNA_GENERO,
+    COLUMNA_PARCELA,
+    COLUMNA_PRODUCTOR,
+    COLUMNAS_FILTRO,
+    COLUMNAS_IDENTIFICADORES,
+    COLUMNAS_REQUERIDAS,
+    COLUMNAS_TABLERO,
+    TODOS,
+    armar_filtros,
+)
+from .cubo import CLAVES_CUBO, COLUMNAS_DISTINTAS, ConsultaCubo, CuboAgregado
+from .distintos import MODOS_DISTINTOS, ConjuntosPorCelda, SketchesHLL
+from .indice import IndiceBitmap
+from .paralelo import construir_en_paralelo, rangos_bytes
+from .sql import MOTORES_SQL, TablaSQL
+from .instantanea import MOTORES, Instantanea, cargar_instantanea
+from .recarga import PATRON_INSTANTANEAS, FuenteDatos, VigilanteDatos, buscar_instantanea_reciente, cargar_incremental
@@ -0,0 +1,174 @@
+"""Almacenes compartidos entre procesos para la caché de figuras y agregados.
+
+Con ``gunicorn app:app`` cada worker es un proceso con su propia memoria; la LRU de
+``CacheFiguras`` no se comparte. Un almacén compartido permite que un resultado calculado
+por un worker lo sirvan todos los demás. Todos implementan la misma interfaz mínima:
+
+- ``obtener(clave) -> str | None``
+- ``guardar(clave, valor)``: escritura atómica (nadie lee un valor a medias)
+- ``limpiar(version)``: descarta lo guardado para versiones de datos distintas a ``version``
+
+Las claves empiezan con la versión de los datos (``"<version>:<resto>"``), así que un
+almacén nunca sirve resultados de otra instantánea del CSV.
+
+``crear_almacen`` elige el almacén a partir de una URL (por defecto la variable de
+entorno ``BITACORAS_CACHE``): ``sqlite:<ruta>``, ``archivos:<directorio>``,
+``redis://...`` o ``ninguno``.
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+# Almacén por defecto: un archivo SQLite junto a la caché Feather de los datos
+URL_POR_DEFECTO = "sqlite:.cache_bitacoras/figuras.sqlite"
+
+
+def separar_version(clave):
+    """Devuelve (version, resto) de una clave ``"<version>:<resto>"``."""
+    version, _, resto = clave.partition(":")
+    return version, resto
+
+
+class AlmacenCache:
+    """Interfaz de un almacén compartido; un servicio tipo Redis solo necesita estos tres métodos."""
+
+    def obtener(self, clave):
+        raise NotImplementedError
+
+    def guardar(self, clave, valor):
+        raise NotImplementedError
+
+    def limpiar(self, version):
+        raise NotImplementedError
+
+
+class AlmacenArchivos(AlmacenCache):
+    """Un archivo por entrada, en un subdirectorio por versión de datos."""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+
+    def _ruta(self, clave):
+        version, resto = separar_version(clave)
+        nombre = hashlib.sha256(resto.encode()).hexdigest()[:32]
+        return os.path.join(self.directorio, version or "sin_version", nombre + ".json")
+
+    def obtener(self, clave):
+        try:
+            with open(self._ruta(clave), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def guardar(self, clave, valor):
+        ruta = self._ruta(clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+                f.write(valor)
+            os.replace(temporal, ruta)
+        except BaseException:
+            os.remove(temporal)
+            raise
+
+    def limpiar(self, version):
+        if not os.path.isdir(self.directorio):
+            return
+        for nombre in os.listdir(self.directorio):
+            if nombre != version:
+                shutil.rmtree(os.path.join(self.directorio, nombre), ignore_errors=True)
+
+
+class AlmacenSQLite(AlmacenCache):
+    """Tabla SQLite (modo WAL) con la versión de datos en una columna propia.
+
+    Cada proceso y cada hilo abre su propia conexión, así que es seguro después de un
+    ``fork`` de gunicorn. Con ``max_entradas`` se descartan las entradas más antiguas.
+    """
+
+    def __init__(self, ruta, max_entradas=5000):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self._local = threading.local()
+
+    def _conexion(self):
+        if getattr(self._local, "pid", None) != os.getpid():
+            directorio = os.path.dirname(os.path.abspath(self.ruta))
+            os.makedirs(directorio, exist_ok=True)
+            conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS entradas ("
+                "clave TEXT PRIMARY KEY, version TEXT NOT NULL, valor TEXT NOT NULL, creado REAL NOT NULL)"
+            )
+            conexion.execute("CREATE INDEX IF NOT EXISTS entradas_creado ON entradas (creado)")
+            self._local.conexion = conexion
+            self._local.pid = os.getpid()
+        return self._local.conexion
+
+    def obtener(self, clave):
+        fila = self._conexion().execute("SELECT valor FROM entradas WHERE clave = ?", (clave,)).fetchone()
+        return fila[0] if fila else None
+
+    def guardar(self, clave, valor):
+        conexion = self._conexion()
+        version, _ = separar_version(clave)
+        # Cada sentencia es su propia transacción: el valor se ve completo o no se ve
+        conexion.execute(
+            "INSERT OR REPLACE INTO entradas (clave, version, valor, creado) VALUES (?, ?, ?, ?)",
+            (clave, version, valor, time.time())
+        )
+        if self.max_entradas:
+            conexion.execute(
+                "DELETE FROM entradas WHERE clave IN ("
+                "SELECT clave FROM entradas ORDER BY creado DESC LIMIT -1 OFFSET ?)",
+                (self.max_entradas,)
+            )
+
+    def limpiar(self, version):
+        self._conexion().execute("DELETE FROM entradas WHERE version != ?", (version,))
+
+
+class AlmacenRedis(AlmacenCache):
+    """Adaptador para cualquier cliente con ``get``/``set`` al estilo de redis-py.
+
+    Las versiones viejas no se borran una por una: caducan con ``ttl`` segundos.
+    """
+
+    def __init__(self, cliente, ttl=7 * 24 * 3600, prefijo="bitacoras:"):
+        self.cliente = cliente
+        self.ttl = ttl
+        self.prefijo = prefijo
+
+    def obtener(self, clave):
+        valor = self.cliente.get(self.prefijo + clave)
+        return valor.decode("utf-8") if isinstance(valor, bytes) else valor
+
+    def guardar(self, clave, valor):
+        # SET es atómico en Redis
+        self.cliente.set(self.prefijo + clave, valor, ex=self.ttl)
+
+    def limpiar(self, version):
+        pass
+
+
+def crear_almacen(url=None):
+    """Crea el almacén descrito por ``url`` (o ``BITACORAS_CACHE``); devuelve None para "ninguno"."""
+    if url is None:
+        url = os.environ.get("BITACORAS_CACHE", URL_POR_DEFECTO)
+    if url in ("", "ninguno"):
+        return None
+    if url.startswith("sqlite:"):
+        return AlmacenSQLite(url[len("sqlite:"):])
+    if url.startswith("archivos:"):
+        return AlmacenArchivos(url[len("archivos:"):])
+    if url.startswith(("redis://", "rediss://")):
+        import redis  # dependencia opcional, solo para este almacén
+
+        return AlmacenRedis(redis.Redis.from_url(url))
+    raise ValueError(f"Almacén de caché desconocido: '{url}'.")
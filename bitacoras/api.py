@@ -0,0 +1,170 @@
+"""API de consulta de los agregados del tablero en JSON, CSV o Arrow IPC.
+
+``crear_api`` devuelve un Blueprint de Flask que se monta en el servidor de la app de
+Dash. ``GET /api/v1/agregados`` acepta:
+
+- Los cinco filtros con el nombre de su columna (``Categoria_Proyecto``, ``Ciclo``,
+  ``Tipo_parcela``, ``Estado``, ``Tipo_Regimen_Hidrico``); sin valor o "Todos" no filtran,
+  igual que los menús del tablero.
+- ``anio_desde`` y ``anio_hasta`` (inclusivos).
+- ``agrupar``: columnas de agrupación separadas por comas, de entre las claves del cubo
+  (por defecto ``Anio``).
+- ``formato``: ``json`` (por defecto), ``csv`` o ``arrow`` (requiere pyarrow).
+
+Las respuestas salen del mismo cubo e índice que las gráficas, pasan por una
+``CacheFiguras`` (con el mismo almacén compartido) y llevan un ETag derivado de la versión
+de los datos, de su configuración de carga (ver ``Instantanea.clave_cache``) y de la
+consulta: una petición repetida con ``If-None-Match`` recibe un 304 sin consultar el cubo
+ni la caché. El área se redondea a 2 decimales, como el "Total de Área" del tablero.
+"""
+import csv
+import hashlib
+import io
+import json
+
+from flask import Blueprint, Response, jsonify, request
+
+from .cache import CacheFiguras
+from .cubo import CLAVES_CUBO
+from .esquema import COLUMNA_ANIO, COLUMNA_AREA, COLUMNAS_FILTRO, TODOS
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - sin pyarrow no hay formato Arrow
+    pa = None
+
+FORMATOS = ("json", "csv", "arrow")
+TIPOS_CONTENIDO = {
+    "json": "application/json",
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+class ErrorConsulta(ValueError):
+    """Parámetros de consulta inválidos (se responde con un 400)."""
+
+
+def leer_parametros(argumentos):
+    """Normaliza los parámetros de la petición en ``(filtros, anio_desde, anio_hasta, agrupar, formato)``."""
+    filtros = tuple(argumentos.get(columna) or TODOS for columna in COLUMNAS_FILTRO)
+    anios = []
+    for nombre in ("anio_desde", "anio_hasta"):
+        valor = argumentos.get(nombre)
+        try:
+            anios.append(int(valor) if valor not in (None, "") else None)
+        except ValueError:
+            raise ErrorConsulta(f"'{nombre}' debe ser un año entero, no '{valor}'.") from None
+    agrupar = tuple(columna.strip() for columna in argumentos.get("agrupar", COLUMNA_ANIO).split(",") if columna.strip())
+    if not agrupar:
+        raise ErrorConsulta(f"'agrupar' no puede estar vacío. Use columnas de {CLAVES_CUBO}.")
+    for columna in agrupar:
+        if columna not in CLAVES_CUBO:
+            raise ErrorConsulta(f"No se puede agrupar por '{columna}'. Use columnas de {CLAVES_CUBO}.")
+    if len(set(agrupar)) < len(agrupar):
+        raise ErrorConsulta(f"'agrupar' repite columnas: '{','.join(agrupar)}'.")
+    formato = argumentos.get("formato", "json")
+    if formato not in FORMATOS:
+        raise ErrorConsulta(f"Formato desconocido: '{formato}'. Use uno de {FORMATOS}.")
+    if formato == "arrow" and pa is None:
+        raise ErrorConsulta("El formato Arrow requiere pyarrow, que no está instalado en el servidor.")
+    return filtros, anios[0], anios[1], agrupar, formato
+
+
+def etiqueta(version, consulta, formato):
+    """ETag fuerte de una consulta sobre ``version`` (la ``clave_cache`` de la instantánea): los datos de una
+    versión no cambian, así que no hace falta calcularla."""
+    texto = json.dumps([version, consulta, formato], ensure_ascii=False)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:32]
+
+
+def _csv(columnas, filas):
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(columnas)
+    escritor.writerows(filas)
+    return salida.getvalue()
+
+
+def _arrow(columnas, filas):
+    tabla = pa.Table.from_pydict({
+        columna: [fila[posicion] for fila in filas] for posicion, columna in enumerate(columnas)
+    })
+    salida = io.BytesIO()
+    with pa.ipc.new_stream(salida, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    return salida.getvalue()
+
+
+def crear_api(fuente, compartido=None, capacidad=256, prefijo="/api/v1", metricas=None):
+    """Blueprint con la API de agregados sobre la instantánea vigente de ``fuente`` (una ``FuenteDatos``).
+
+    ``metricas`` es un ``RegistroMetricas`` opcional donde la caché mide su serialización.
+    """
+    api = Blueprint("bitacoras_api", __name__, url_prefix=prefijo)
+
+    def calcular(filtros, anio_desde, anio_hasta, agrupar):
+        """Columnas, filas y totales de una consulta (la caché los guarda serializados en JSON)."""
+        filas, totales = fuente.actual.cubo.agregar(
+            dict(zip(COLUMNAS_FILTRO, filtros)), por=agrupar, anio_desde=anio_desde, anio_hasta=anio_hasta
+        )
+        # El cubo suma el área en float32: sin redondear saldrían valores como 2036.5000005960464
+        filas[COLUMNA_AREA] = filas[COLUMNA_AREA].astype("float64").round(2)
+        totales[COLUMNA_AREA] = round(float(totales[COLUMNA_AREA]), 2)
+        return [str(columna) for columna in filas.columns], filas.astype(object).to_numpy().tolist(), totales
+
+    # Misma caché (y mismo almacén compartido) que las figuras, en su propio espacio de claves
+    cache = CacheFiguras(
+        calcular, capacidad=capacidad, version=fuente.actual.clave_cache, compartido=compartido, espacio="api", metricas=metricas
+    )
+    fuente.suscribir(lambda nueva: cache.invalidar(nueva.clave_cache))
+    api.cache = cache
+
+    @api.errorhandler(ErrorConsulta)
+    def consulta_invalida(error):
+        return jsonify({"error": str(error)}), 400
+
+    @api.get("/agregados")
+    def agregados():
+        filtros, anio_desde, anio_hasta, agrupar, formato = leer_parametros(request.args)
+        consulta = [list(filtros), anio_desde, anio_hasta, list(agrupar)]
+        actual = fuente.actual
+        clave = etiqueta(actual.clave_cache, consulta, formato)
+        if request.if_none_match.contains(clave):
+            respuesta = Response(status=304)
+        else:
+            columnas, filas, totales = cache.obtener(tuple(filtros), anio_desde, anio_hasta, tuple(agrupar))
+            if formato == "json":
+                cuerpo = json.dumps({
+                    "version": actual.version,
+                    "filtros": dict(zip(COLUMNAS_FILTRO, filtros)),
+                    "anio_desde": anio_desde,
+                    "anio_hasta": anio_hasta,
+                    "agrupar": list(agrupar),
+                    "filas": [dict(zip(columnas, fila)) for fila in filas],
+                    "totales": totales,
+                }, ensure_ascii=False)
+            elif formato == "csv":
+                cuerpo = _csv(columnas, filas)
+            else:
+                cuerpo = _arrow(columnas, filas)
+            respuesta = Response(cuerpo, content_type=TIPOS_CONTENIDO[formato])
+        respuesta.set_etag(clave)
+        respuesta.headers["Cache-Control"] = "no-cache"
+        return respuesta
+
+    @api.get("/dimensiones")
+    def dimensiones():
+        """Valores posibles de cada filtro y el rango de años de la instantánea vigente."""
+        actual = fuente.actual
+        anio_inicio, anio_fin = actual.anios
+        respuesta = jsonify({
+            "version": actual.version,
+            "filtros": {columna: [str(valor) for valor in actual.cubo.valores(columna)] for columna in COLUMNAS_FILTRO},
+            "anios": [anio_inicio, anio_fin],
+            "agrupar": CLAVES_CUBO,
+        })
+        respuesta.set_etag(etiqueta(actual.clave_cache, "dimensiones", "json"))
+        return respuesta.make_conditional(request)
+
+    return api
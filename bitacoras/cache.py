@@ -0,0 +1,160 @@
+"""Caché de las salidas de los callbacks (figuras y totales) por combinación de filtros.
+
+Solo existen |categorías|×|ciclos|×|tipos|×|estados|×|regímenes| estados posibles de los
+menús y el tráfico se concentra en unos pocos, así que guardar las figuras ya
+serializadas evita reconstruirlas con ``px.*`` en cada petición. Las entradas se guardan
+como JSON (inmutable, seguro de compartir entre hilos) en una LRU acotada; la clave
+incluye la versión de los datos, y al cambiar la versión la caché se vacía.
+
+Opcionalmente, detrás de la LRU local hay un almacén compartido entre procesos (ver
+``almacenes``): lo que calcula un worker de gunicorn lo aprovechan los demás.
+"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from plotly.io.json import to_json_plotly
+
+from .esquema import COLUMNAS_FILTRO, TODOS
+from .metricas import AYUDA_ETAPAS, cronometro
+
+logger = logging.getLogger(__name__)
+
+# Versión del formato de las entradas en el almacén compartido; cambiarla ignora las guardadas por
+# versiones anteriores del tablero (p. ej. cuando las salidas del callback cambian de forma)
+VERSION_ENTRADAS = 2
+
+
+class CacheFiguras:
+    """LRU acotada de las salidas serializadas de ``calcular(*filtros)``, con almacén compartido opcional."""
+
+    def __init__(self, calcular, capacidad=256, version=None, compartido=None, espacio="figuras", metricas=None):
+        # Función que recibe los cinco valores de los menús y devuelve la tupla de salidas del callback
+        self.calcular = calcular
+        self.capacidad = capacidad
+        self.version = version
+        # AlmacenCache compartido entre procesos (o None) y prefijo de las claves en él
+        self.compartido = compartido
+        self.espacio = espacio
+        # RegistroMetricas opcional donde se miden la serialización y la deserialización
+        self.metricas = metricas
+        self.aciertos = 0
+        self.aciertos_compartidos = 0
+        self.fallos = 0
+        self._entradas = OrderedDict()
+        self._candado = threading.Lock()
+
+    def obtener(self, *filtros):
+        """Salidas del callback para los filtros dados, desde la caché o recién calculadas."""
+        clave = (self.version, filtros)
+        with self._candado:
+            serializado = self._entradas.get(clave)
+            if serializado is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+        if serializado is None:
+            serializado = self._leer_compartido(clave)
+            with self._candado:
+                if serializado is not None:
+                    self.aciertos_compartidos += 1
+                else:
+                    self.fallos += 1
+            if serializado is not None:
+                self._guardar_local(clave, serializado)
+            else:
+                serializado = self._guardar(clave, self.calcular(*filtros))
+        with cronometro(self.metricas, "etapa_segundos", AYUDA_ETAPAS, etapa="deserializacion", espacio=self.espacio):
+            return json.loads(serializado)
+
+    def _clave_compartida(self, clave):
+        version, filtros = clave
+        return f"{version}:{self.espacio}:v{VERSION_ENTRADAS}:{json.dumps(list(filtros), ensure_ascii=False)}"
+
+    def _leer_compartido(self, clave):
+        if self.compartido is None:
+            return None
+        try:
+            return self.compartido.obtener(self._clave_compartida(clave))
+        except Exception:
+            # Un almacén compartido caído no debe tumbar el tablero: se recalcula localmente
+            logger.warning("No se pudo leer la caché compartida", exc_info=True)
+            return None
+
+    def _guardar(self, clave, salidas):
+        with cronometro(self.metricas, "etapa_segundos", AYUDA_ETAPAS, etapa="serializacion", espacio=self.espacio):
+            serializado = to_json_plotly(list(salidas))
+        if self._guardar_local(clave, serializado) and self.compartido is not None:
+            try:
+                self.compartido.guardar(self._clave_compartida(clave), serializado)
+            except Exception:
+                logger.warning("No se pudo escribir en la caché compartida", exc_info=True)
+        return serializado
+
+    def _guardar_local(self, clave, serializado):
+        with self._candado:
+            # Una versión nueva pudo llegar mientras se calculaba; no guardar resultados viejos
+            if clave[0] != self.version:
+                return False
+            self._entradas[clave] = serializado
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+        return True
+
+    def precalentar(self, combinaciones):
+        """Calcula de antemano las combinaciones de filtros indicadas (las que aún no estén en caché)."""
+        for filtros in combinaciones:
+            clave = (self.version, tuple(filtros))
+            with self._candado:
+                presente = clave in self._entradas
+            if presente:
+                continue
+            serializado = self._leer_compartido(clave)
+            if serializado is not None:
+                self._guardar_local(clave, serializado)
+            else:
+                self._guardar(clave, self.calcular(*filtros))
+
+    def invalidar(self, version=None):
+        """Vacía la caché local; con ``version`` además cambia la versión de los datos usada en las claves
+        y descarta del almacén compartido lo guardado para otras versiones."""
+        with self._candado:
+            if version is not None:
+                self.version = version
+            self._entradas.clear()
+        if version is not None and self.compartido is not None:
+            try:
+                self.compartido.limpiar(version)
+            except Exception:
+                logger.warning("No se pudo limpiar la caché compartida", exc_info=True)
+
+    def estadisticas(self):
+        """Aciertos (locales y del almacén compartido), fallos, tasa de aciertos y ocupación de la caché."""
+        with self._candado:
+            consultas = self.aciertos + self.aciertos_compartidos + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "aciertos_compartidos": self.aciertos_compartidos,
+                "fallos": self.fallos,
+                "tasa_aciertos": (self.aciertos + self.aciertos_compartidos) / consultas if consultas else 0.0,
+                "entradas": len(self._entradas),
+                "capacidad": self.capacidad,
+                "version": self.version,
+            }
+
+
+def combinaciones_comunes(valores, columnas=("Estado",)):
+    """Combinaciones para precalentar: todo en "Todos" y cada valor de ``columnas`` con el resto en "Todos".
+
+    ``valores`` es un diccionario columna -> valores posibles (p. ej. ``cubo.valores``).
+    """
+    todos = [TODOS] * len(COLUMNAS_FILTRO)
+    combinaciones = [tuple(todos)]
+    for columna in columnas:
+        posicion = COLUMNAS_FILTRO.index(columna)
+        for valor in valores[columna]:
+            combinacion = list(todos)
+            combinacion[posicion] = valor
+            combinaciones.append(tuple(combinacion))
+    return combinaciones
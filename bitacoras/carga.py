@@ -0,0 +1,268 @@
+"""Lectura y limpieza del CSV de Datos_Historicos, con caché columnar en disco.
+
+La primera carga lee el CSV con tipos explícitos, lo limpia igual que los tableros
+(nulos a "NA", Anio y área numéricos, rango de años) y guarda el resultado tipado en un
+archivo Feather (Arrow IPC) sin compresión: dimensiones y Genero como categóricas, Anio
+como int16 y el área como float32. Las cargas siguientes mapean ese archivo en memoria
+en lugar de volver a parsear el CSV. El nombre del archivo de caché incluye una clave
+derivada del CSV (tamaño y fecha de modificación, o el hash de su contenido), así que
+un CSV nuevo o modificado genera una caché nueva automáticamente.
+
+Antes de guardarse, los datos pasan por ``compactar_datos``: se descartan las columnas
+que ninguna gráfica lee, los identificadores pasan a categóricos y las columnas numéricas
+se reducen al tipo más pequeño que las contiene.
+
+Para CSVs que no caben en memoria, ``leer_csv_por_bloques`` entrega el archivo en bloques
+de filas ya limpios (solo las columnas del tablero), que se agregan uno a uno en el cubo
+sin armar nunca el DataFrame completo.
+"""
+import datetime
+import hashlib
+import logging
+import os
+import re
+import tempfile
+
+import pandas as pd
+
+from .esquema import (
+    ANIO_FIN,
+    ANIO_INICIO,
+    COLUMNA_ANIO,
+    COLUMNA_AREA,
+    COLUMNAS_CATEGORICAS,
+    COLUMNAS_IDENTIFICADORES,
+    COLUMNAS_REQUERIDAS,
+    COLUMNAS_TABLERO,
+    TIPOS_CSV,
+)
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - sin pyarrow se lee siempre el CSV
+    feather = None
+
+# Filas por bloque en la lectura por bloques; la memoria pico depende de este valor, no del tamaño del CSV
+FILAS_POR_BLOQUE = 250_000
+
+# Se incrementa cuando cambia la limpieza o los tipos guardados, para invalidar cachés viejas
+VERSION_CACHE = 2
+
+
+def fecha_instantanea(archivo):
+    """Fecha de corte de un CSV a partir de su nombre (``..._al26032025.csv``), o None si no la trae."""
+    coincidencia = re.search(r"al(\d{2})(\d{2})(\d{4})", os.path.basename(archivo))
+    if coincidencia is None:
+        return None
+    dia, mes, anio = (int(grupo) for grupo in coincidencia.groups())
+    try:
+        return datetime.date(anio, mes, dia)
+    except ValueError:
+        return None
+
+
+def anio_final(archivo):
+    """Último año que se muestra: el de la fecha de corte del CSV, o ANIO_FIN si el nombre no la trae."""
+    fecha = fecha_instantanea(archivo)
+    return fecha.year if fecha else ANIO_FIN
+
+
+def validar_columnas(columnas):
+    """Lanza ValueError si falta alguna de las columnas requeridas."""
+    for columna in COLUMNAS_REQUERIDAS:
+        if columna not in columnas:
+            raise ValueError(f"La columna '{columna}' no existe en el archivo CSV.")
+
+
+def leer_csv(archivo):
+    """Lee el CSV con los tipos de TIPOS_CSV y valida las columnas requeridas."""
+    datos = pd.read_csv(archivo, dtype=TIPOS_CSV, low_memory=False)
+    validar_columnas(datos.columns)
+    return datos
+
+
+def leer_encabezado(archivo):
+    """Lee solo la primera línea del CSV, valida las columnas requeridas y devuelve los nombres de columnas."""
+    columnas = pd.read_csv(archivo, nrows=0).columns
+    validar_columnas(columnas)
+    return columnas
+
+
+def leer_csv_por_bloques(archivo, filas_por_bloque=FILAS_POR_BLOQUE, anio_inicio=ANIO_INICIO, anio_fin=None):
+    """Genera el CSV en bloques de ``filas_por_bloque`` filas, cada uno ya limpio con ``limpiar_datos``.
+
+    Las columnas se validan una sola vez, en el encabezado, y solo se leen las del tablero.
+    ``anio_fin`` es por defecto el año de corte del archivo (ver ``anio_final``).
+    """
+    columnas = leer_encabezado(archivo)
+    usadas = [columna for columna in columnas if columna in COLUMNAS_TABLERO]
+    if anio_fin is None:
+        anio_fin = anio_final(archivo)
+    tipos = {columna: tipo for columna, tipo in TIPOS_CSV.items() if columna in usadas}
+    with pd.read_csv(archivo, dtype=tipos, usecols=usadas, chunksize=filas_por_bloque) as lector:
+        for bloque in lector:
+            yield limpiar_datos(bloque, anio_inicio, anio_fin)
+
+
+def limpiar_datos(datos, anio_inicio=ANIO_INICIO, anio_fin=ANIO_FIN):
+    """Aplica la limpieza de los tableros y deja las columnas conocidas con tipos compactos."""
+    # Reemplazar valores nulos con "NA" para evitar problemas en los análisis
+    for columna in COLUMNAS_REQUERIDAS:
+        datos[columna] = datos[columna].fillna("NA")
+
+    datos[COLUMNA_ANIO] = pd.to_numeric(datos[COLUMNA_ANIO], errors="coerce")
+    datos[COLUMNA_AREA] = pd.to_numeric(datos[COLUMNA_AREA], errors="coerce").fillna(0).astype("float32")
+
+    # Filtrar los datos para incluir solo los años en el rango deseado
+    datos = datos[(datos[COLUMNA_ANIO] >= anio_inicio) & (datos[COLUMNA_ANIO] <= anio_fin)].reset_index(drop=True)
+    datos[COLUMNA_ANIO] = datos[COLUMNA_ANIO].astype("int16")
+
+    for columna in COLUMNAS_CATEGORICAS:
+        if columna in datos.columns:
+            datos[columna] = datos[columna].astype("category")
+    return datos
+
+
+def memoria_mb(datos):
+    """Memoria ocupada por un DataFrame, en MB, contando el contenido de las cadenas."""
+    return datos.memory_usage(deep=True).sum() / 1e6
+
+
+def compactar_datos(datos):
+    """Deja solo las columnas del tablero, con categóricas para texto e identificadores y números reducidos.
+
+    Registra en el log la memoria antes y después de compactar.
+    """
+    memoria_antes = memoria_mb(datos)
+    eliminadas = [columna for columna in datos.columns if columna not in COLUMNAS_TABLERO]
+    datos = datos.drop(columns=eliminadas)
+
+    for columna in COLUMNAS_CATEGORICAS + COLUMNAS_IDENTIFICADORES:
+        if columna in datos.columns and not isinstance(datos[columna].dtype, pd.CategoricalDtype):
+            datos[columna] = datos[columna].astype("category")
+
+    for columna in datos.select_dtypes(include="integer").columns:
+        datos[columna] = pd.to_numeric(datos[columna], downcast="integer")
+    for columna in datos.select_dtypes(include="floating").columns:
+        datos[columna] = pd.to_numeric(datos[columna], downcast="float")
+
+    logger.info(
+        "Memoria de los datos: %.1f MB -> %.1f MB (%d columnas descartadas)",
+        memoria_antes, memoria_mb(datos), len(eliminadas)
+    )
+    return datos
+
+
+def clave_archivo(archivo, por_contenido=False):
+    """Clave corta que cambia cuando cambia el CSV: tamaño y mtime, o el SHA-256 de su contenido."""
+    huella = hashlib.sha256(f"v{VERSION_CACHE}".encode())
+    if por_contenido:
+        with open(archivo, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                huella.update(bloque)
+    else:
+        estado = os.stat(archivo)
+        huella.update(f"{estado.st_size}:{estado.st_mtime_ns}".encode())
+    return huella.hexdigest()[:16]
+
+
+def sha256_prefijo(archivo, tamano):
+    """SHA-256 (objeto de ``hashlib``) de los primeros ``tamano`` bytes de una ruta o de un archivo binario abierto.
+
+    Con un archivo abierto se lee desde su posición actual, así que quien lo llama puede seguir leyendo los bytes
+    que vienen después y agregarlos a la huella.
+    """
+    if isinstance(archivo, (str, os.PathLike)):
+        with open(archivo, "rb") as f:
+            return sha256_prefijo(f, tamano)
+    huella = hashlib.sha256()
+    restante = tamano
+    while restante > 0:
+        bloque = archivo.read(min(restante, 1 << 20))
+        if not bloque:
+            break
+        huella.update(bloque)
+        restante -= len(bloque)
+    return huella
+
+
+def _directorio_cache(archivo, directorio_cache=None):
+    """Directorio de las cachés: el indicado o ``.cache_bitacoras/`` junto al CSV."""
+    if directorio_cache is None:
+        return os.path.join(os.path.dirname(os.path.abspath(archivo)), ".cache_bitacoras")
+    return directorio_cache
+
+
+def ruta_cache(archivo, directorio_cache=None, por_contenido=False, extension="feather"):
+    """Ruta del archivo de caché (Feather por defecto) que corresponde a la versión actual del CSV."""
+    base = os.path.splitext(os.path.basename(archivo))[0]
+    nombre = f"{base}.{clave_archivo(archivo, por_contenido)}.{extension}"
+    return os.path.join(_directorio_cache(archivo, directorio_cache), nombre)
+
+
+def limpiar_cache(archivo, directorio_cache=None, extensiones=("feather",), conservar=None):
+    """Borra los archivos de caché del CSV ``archivo`` con esas extensiones, salvo la ruta ``conservar``.
+
+    Con ``conservar`` (la caché recién escrita) se descartan las de versiones anteriores del mismo CSV;
+    sin él, todas las de ese CSV (p. ej. cuando otra instantánea lo reemplaza). Un proceso que todavía
+    tenga abierta o mapeada una de ellas la sigue leyendo hasta cerrarla.
+    """
+    directorio = _directorio_cache(archivo, directorio_cache)
+    base = os.path.splitext(os.path.basename(archivo))[0]
+    patron = re.compile(rf"{re.escape(base)}\.[0-9a-f]{{16}}\.(?:{'|'.join(map(re.escape, extensiones))})")
+    if not os.path.isdir(directorio):
+        return []
+    borradas = []
+    for nombre in os.listdir(directorio):
+        candidata = os.path.join(directorio, nombre)
+        if patron.fullmatch(nombre) and candidata != conservar:
+            try:
+                os.remove(candidata)
+                borradas.append(candidata)
+            except OSError:
+                logger.warning("No se pudo borrar la caché vieja %s", candidata, exc_info=True)
+    if borradas:
+        logger.info("Cachés viejas borradas: %s", ", ".join(os.path.basename(borrada) for borrada in borradas))
+    return borradas
+
+
+def _guardar_feather(datos, ruta):
+    """Escribe el Feather en un archivo temporal y lo renombra, para que otro proceso nunca lea uno a medias."""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    # Las columnas que no usan los tableros pueden traer tipos mezclados; Arrow necesita un solo tipo
+    datos = datos.copy(deep=False)
+    for columna in datos.columns:
+        if datos[columna].dtype == object:
+            datos[columna] = datos[columna].astype("string")
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+    os.close(descriptor)
+    try:
+        datos.to_feather(temporal, compression="uncompressed")
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.remove(temporal)
+        raise
+
+
+def cargar_datos(archivo, directorio_cache=None, por_contenido=False, usar_cache=True):
+    """Devuelve el DataFrame limpio y compactado del CSV, usando (o creando) su caché Feather.
+
+    Lanza FileNotFoundError si el CSV no existe y ValueError si le faltan columnas.
+    """
+    if not os.path.exists(archivo):
+        raise FileNotFoundError(archivo)
+    if not usar_cache or feather is None:
+        return compactar_datos(limpiar_datos(leer_csv(archivo), anio_fin=anio_final(archivo)))
+
+    ruta = ruta_cache(archivo, directorio_cache, por_contenido)
+    if os.path.exists(ruta):
+        # Sin compresión, Arrow mapea el archivo en memoria y las columnas numéricas no se copian
+        return feather.read_table(ruta, memory_map=True).to_pandas(split_blocks=True)
+
+    datos = compactar_datos(limpiar_datos(leer_csv(archivo), anio_fin=anio_final(archivo)))
+    _guardar_feather(datos, ruta)
+    # Cada versión del CSV deja su propio Feather: solo se conserva el de la vigente
+    limpiar_cache(archivo, directorio_cache, conservar=ruta)
+    return datos
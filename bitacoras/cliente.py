@@ -0,0 +1,88 @@
+"""Serialización compacta del cubo para el modo de filtrado en el navegador.
+
+En ese modo el cubo viaja una sola vez por sesión dentro de un ``dcc.Store`` y los
+callbacks del lado del cliente (``assets/filtrado_cliente.js``) recalculan las cinco
+gráficas y sus totales sin volver al servidor. Los arreglos numéricos van en base64
+(little-endian) para que el navegador los lea directamente como ``TypedArray``:
+
+- ``anios``, ``observaciones`` (Int32) y ``area`` (Float64): uno por celda.
+- ``codigos``: por columna de filtro, la posición del valor de cada celda en ``dimensiones``.
+- ``generos``: conteos por celda y género (Int32, fila por celda), o None.
+- ``distintos``: por columna de identificador, en formato CSR por celda: los códigos de
+  los identificadores (modo "exacto") o los registros no nulos del sketch HyperLogLog
+  codificados como ``registro * 64 + rango`` (modo "aproximado").
+- ``figuras``: las figuras de la vista sin filtros, que el cliente usa como plantilla y
+  solo les cambia los datos (así conservan títulos, etiquetas y estilo de ``px``).
+"""
+import base64
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+
+from .distintos import ConjuntosPorCelda
+from .esquema import COLUMNA_ANIO, COLUMNA_AREA, COLUMNAS_FILTRO
+from .figuras import figuras_sin_filtros
+
+
+def _base64(arreglo, tipo):
+    return base64.b64encode(np.ascontiguousarray(arreglo, dtype=tipo).tobytes()).decode("ascii")
+
+
+def _serializar_distintos(distintos):
+    if isinstance(distintos, ConjuntosPorCelda):
+        return {
+            "modo": "exacto",
+            "n_valores": int(distintos.n_valores),
+            "punteros": _base64(distintos.punteros, "<i4"),
+            "codigos": _base64(distintos.codigos, "<i4"),
+        }
+    # Solo se envían los registros no nulos, también los de las celdas que en el servidor son densas
+    celdas, registros, rangos = distintos.ternas()
+    orden = np.argsort(celdas, kind="stable")
+    celdas, registros, rangos = celdas[orden], registros[orden], rangos[orden].astype(np.uint32)
+    n_celdas = len(distintos.fila_densa)
+    punteros = np.zeros(n_celdas + 1, dtype=np.int64)
+    np.cumsum(np.bincount(celdas, minlength=n_celdas), out=punteros[1:])
+    return {
+        "modo": "aproximado",
+        "precision": int(distintos.precision),
+        "punteros": _base64(punteros, "<i4"),
+        "entradas": _base64(registros.astype(np.uint32) * 64 + rangos, "<u4"),
+    }
+
+
+def serializar_cubo(cubo, version=None):
+    """Diccionario JSON con todo lo que necesita el filtrado en el navegador (ver el docstring del módulo)."""
+    celdas = cubo.celdas
+    dimensiones = {columna: [str(valor) for valor in cubo.valores(columna)] for columna in COLUMNAS_FILTRO}
+    codigos = {
+        columna: _base64(pd.Index(cubo.valores(columna)).get_indexer(celdas[columna]), "<i4")
+        for columna in COLUMNAS_FILTRO
+    }
+    generos = None
+    if cubo.generos is not None:
+        generos = {
+            "nombres": [str(genero) for genero in cubo.generos.columns],
+            "conteos": _base64(cubo.generos.to_numpy(), "<i4"),
+        }
+    return {
+        "version": version,
+        "n_celdas": len(celdas),
+        "dimensiones": dimensiones,
+        "codigos": codigos,
+        "anios": _base64(celdas[COLUMNA_ANIO], "<i4"),
+        "observaciones": _base64(celdas["Observaciones"], "<i4"),
+        "area": _base64(celdas[COLUMNA_AREA], "<f8"),
+        "generos": generos,
+        "distintos": {columna: _serializar_distintos(distintos) for columna, distintos in cubo.distintos.items()},
+        # Cuatro figuras de barras y la de género
+        "figuras": figuras_sin_filtros(cubo),
+    }
+
+
+def tamano_cubo_mb(cubo_cliente):
+    """MB del cubo serializado tal como viaja en el layout, sin comprimir y con gzip."""
+    texto = json.dumps(cubo_cliente, separators=(",", ":"), ensure_ascii=False).encode()
+    return len(texto) / 1e6, len(gzip.compress(texto, compresslevel=6)) / 1e6
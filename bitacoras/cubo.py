@@ -0,0 +1,262 @@
+"""Cubo preagregado sobre Anio y las cinco dimensiones de los filtros.
+
+Cada celda del cubo es una combinación observada de (Anio, Categoria_Proyecto, Ciclo,
+Estado, Tipo_Regimen_Hidrico, Tipo_parcela) y guarda el número de bitácoras, la suma del
+área, los conteos por género y una estructura combinable (ver ``distintos``) para contar
+parcelas y productores únicos. Las consultas filtran celdas con un ``IndiceBitmap`` y
+suman, así que su costo depende del número de celdas y no del tamaño del CSV.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .distintos import construir_distintos
+from .esquema import COLUMNA_ANIO, COLUMNA_AREA, COLUMNA_GENERO, COLUMNA_PARCELA, COLUMNA_PRODUCTOR, COLUMNAS_FILTRO
+from .indice import IndiceBitmap
+from .metricas import AYUDA_ETAPAS, cronometro
+
+# Claves de las celdas, en el mismo orden que la agrupación original de `datos_agrupados`
+CLAVES_CUBO = ["Anio", "Categoria_Proyecto", "Ciclo", "Estado", "Tipo_Regimen_Hidrico", "Tipo_parcela"]
+
+# Columnas de identificadores cuyos valores únicos se cuentan por año
+COLUMNAS_DISTINTAS = [COLUMNA_PARCELA, COLUMNA_PRODUCTOR]
+
+
+@dataclass
+class ConsultaCubo:
+    """Resultado de filtrar el cubo: totales por año, valores únicos y conteos por género."""
+
+    # Columnas Anio, Observaciones, Area_total_de_la_parcela(ha) y una por cada columna
+    # de COLUMNAS_DISTINTAS presente en el CSV (valores únicos en el año); una fila por año
+    por_anio: pd.DataFrame
+    # Valores únicos en todo el periodo filtrado, por columna de COLUMNAS_DISTINTAS
+    totales_distintos: dict
+    # Registros por valor de Genero (sin valores en cero); None si el CSV no trae Genero
+    generos: pd.Series | None
+
+
+class CuboAgregado:
+    """Celdas preagregadas con un índice de mapas de bits sobre sus dimensiones."""
+
+    def __init__(self, celdas, generos=None, distintos=None):
+        # Claves, "Observaciones" y suma de área por celda, ordenadas por año
+        self.celdas = celdas
+        # Conteos por género alineados fila a fila con `celdas`
+        self.generos = generos
+        # {columna de identificador: ConjuntosPorCelda o SketchesHLL}
+        self.distintos = distintos or {}
+        self.indice = IndiceBitmap.construir(celdas, COLUMNAS_FILTRO)
+        self._anios = celdas[COLUMNA_ANIO].to_numpy()
+        # Posición del valor de cada celda en `valores(columna)` (mismo orden que el índice), para las facetas
+        self._codigos = {
+            columna: pd.factorize(celdas[columna], use_na_sentinel=False)[0] for columna in COLUMNAS_FILTRO
+        }
+        self._observaciones = celdas["Observaciones"].to_numpy()
+
+    @classmethod
+    def construir(cls, datos, modo_distintos="exacto", error_hll=0.02):
+        """Agrega un DataFrame ya limpio en celdas (Anio × cinco dimensiones).
+
+        ``modo_distintos`` elige cómo se cuentan parcelas y productores únicos: "exacto"
+        (conjuntos de identificadores por celda) o "aproximado" (HyperLogLog con error
+        relativo estándar ``error_hll``).
+        """
+        agrupado = datos.groupby(CLAVES_CUBO, observed=True)
+        celda_fila = agrupado.ngroup().to_numpy()
+        celdas = agrupado.size().reset_index(name="Observaciones")
+        # El área se acumula en float64 aunque la columna venga en float32
+        celdas[COLUMNA_AREA] = np.bincount(celda_fila, weights=datos[COLUMNA_AREA].to_numpy(), minlength=len(celdas))
+
+        generos = None
+        if COLUMNA_GENERO in datos.columns:
+            generos = datos.groupby(CLAVES_CUBO + [COLUMNA_GENERO], observed=True).size().unstack(COLUMNA_GENERO, fill_value=0)
+            generos = generos.reindex(pd.MultiIndex.from_frame(celdas[CLAVES_CUBO]), fill_value=0).reset_index(drop=True)
+            generos.columns = generos.columns.astype(object)
+
+        distintos = {
+            columna: construir_distintos(modo_distintos, celda_fila, datos[columna], len(celdas), error_hll)
+            for columna in COLUMNAS_DISTINTAS if columna in datos.columns
+        }
+        return cls(celdas, generos, distintos)
+
+    @classmethod
+    def combinar(cls, cubos):
+        """Junta varios cubos construidos sobre filas disjuntas en uno solo.
+
+        El resultado es idéntico al de construir el cubo sobre todas las filas juntas:
+        los conteos y áreas se suman, y las estructuras de valores distintos se unen.
+        """
+        claves = pd.concat([cubo.celdas[CLAVES_CUBO] for cubo in cubos], ignore_index=True)
+        # Las categóricas de cada cubo pueden tener categorías distintas
+        claves = claves.astype({columna: object for columna in COLUMNAS_FILTRO})
+        agrupado = claves.groupby(CLAVES_CUBO, sort=True)
+        celda_nueva = agrupado.ngroup().to_numpy()
+        n_celdas = agrupado.ngroups
+
+        celdas = agrupado.size().reset_index()[CLAVES_CUBO]
+        celdas = celdas.astype({columna: "category" for columna in COLUMNAS_FILTRO})
+        celdas[COLUMNA_ANIO] = celdas[COLUMNA_ANIO].astype(cubos[0].celdas[COLUMNA_ANIO].dtype)
+        for columna in ["Observaciones", COLUMNA_AREA]:
+            sumas = np.bincount(celda_nueva, weights=pd.concat([cubo.celdas[columna] for cubo in cubos]).to_numpy(), minlength=n_celdas)
+            celdas[columna] = sumas.astype(cubos[0].celdas[columna].dtype)
+
+        generos = None
+        if all(cubo.generos is not None for cubo in cubos):
+            generos = pd.concat([cubo.generos for cubo in cubos], ignore_index=True).fillna(0).astype("int64")
+            generos = generos.groupby(celda_nueva).sum().reindex(range(n_celdas), fill_value=0).reset_index(drop=True)
+            generos = generos[sorted(generos.columns)]
+
+        # Celda nueva de cada celda de cada cubo
+        limites = np.cumsum([0] + [len(cubo.celdas) for cubo in cubos])
+        mapas = [celda_nueva[inicio:fin] for inicio, fin in zip(limites[:-1], limites[1:])]
+        distintos = {}
+        for columna in COLUMNAS_DISTINTAS:
+            if all(columna in cubo.distintos for cubo in cubos):
+                estructuras = [cubo.distintos[columna] for cubo in cubos]
+                partes = list(zip(estructuras, mapas))
+                distintos[columna] = type(estructuras[0]).combinar(partes, n_celdas)
+        return cls(celdas, generos, distintos)
+
+    @classmethod
+    def construir_por_bloques(cls, bloques, modo_distintos="exacto", error_hll=0.02, bloques_por_combinacion=8):
+        """Agrega una secuencia de DataFrames ya limpios (p. ej. ``leer_csv_por_bloques``) sin juntarlos.
+
+        Cada bloque se agrega en su propio cubo y se descarta, y los cubos parciales se van
+        combinando (ver ``plegar``): en memoria solo hay un bloque de filas y cubos, cuyo
+        tamaño depende del número de celdas y no del de filas.
+        """
+        ultimo = None
+
+        def parciales():
+            nonlocal ultimo
+            for bloque in bloques:
+                ultimo = bloque
+                if len(bloque):
+                    yield cls.construir(bloque, modo_distintos=modo_distintos, error_hll=error_hll)
+
+        cubo = cls.plegar(parciales(), bloques_por_combinacion)
+        if cubo is None and ultimo is not None:
+            # Ningún bloque tenía filas en el rango de años: un cubo vacío con las columnas esperadas
+            cubo = cls.construir(ultimo, modo_distintos=modo_distintos, error_hll=error_hll)
+        return cubo
+
+    @classmethod
+    def plegar(cls, cubos, cubos_por_combinacion=8):
+        """Combina una secuencia de cubos a medida que llegan, de ``cubos_por_combinacion`` en
+        ``cubos_por_combinacion`` con el acumulado; devuelve None si la secuencia está vacía."""
+        acumulado = None
+        pendientes = []
+        for cubo in cubos:
+            pendientes.append(cubo)
+            if len(pendientes) >= cubos_por_combinacion:
+                acumulado = cls._combinar_pendientes(acumulado, pendientes)
+                pendientes = []
+        if pendientes:
+            acumulado = cls._combinar_pendientes(acumulado, pendientes)
+        return acumulado
+
+    @classmethod
+    def _combinar_pendientes(cls, acumulado, pendientes):
+        cubos = pendientes if acumulado is None else [acumulado] + pendientes
+        return cubos[0] if len(cubos) == 1 else cls.combinar(cubos)
+
+    def rango_anios(self):
+        """Primer y último año con datos, o None si el cubo está vacío."""
+        if not len(self._anios):
+            return None
+        return int(self._anios.min()), int(self._anios.max())
+
+    def memoria_mb(self):
+        """MB por componente: las celdas (con los géneros), el índice y la estructura de cada columna de distintos."""
+        memoria = {
+            "celdas": float(self.celdas.memory_usage(deep=True).sum()) / 1e6,
+            "indice": sum(mapa.nbytes for mapas in self.indice.mapas.values() for mapa in mapas.values()) / 1e6,
+        }
+        if self.generos is not None:
+            memoria["celdas"] += float(self.generos.memory_usage(deep=True).sum()) / 1e6
+        for columna, distintos in self.distintos.items():
+            memoria[columna] = distintos.memoria_bytes() / 1e6
+        return memoria
+
+    def valores(self, columna):
+        """Valores de una dimensión en el orden en que aparecen en el cubo."""
+        return self.indice.valores(columna)
+
+    def facetas(self, filtros):
+        """Bitácoras por valor de cada dimensión de los filtros, aplicando los filtros de las otras cuatro.
+
+        Devuelve ``{columna: {valor: bitácoras}}`` con los valores en el orden de ``valores``, incluidos
+        los que quedan en cero. Cada columna es un AND de a lo más cuatro mapas de bits y una suma
+        por código sobre las celdas, sin tocar las filas del CSV.
+        """
+        facetas = {}
+        for columna in COLUMNAS_FILTRO:
+            otros = {otra: valor for otra, valor in filtros.items() if otra != columna}
+            mascara = self.indice.mascara(otros)
+            valores = self.valores(columna)
+            conteos = np.bincount(
+                self._codigos[columna][mascara], weights=self._observaciones[mascara], minlength=len(valores)
+            )
+            facetas[columna] = dict(zip(valores, conteos.astype(np.int64).tolist()))
+        return facetas
+
+    def consultar(self, filtros, metricas=None):
+        """Suma las celdas que cumplen los filtros y las agrupa por año.
+
+        Con ``metricas`` (un ``RegistroMetricas``) se mide cada etapa: máscara, suma por año,
+        valores distintos y géneros.
+        """
+        def etapa(nombre):
+            return cronometro(metricas, "etapa_segundos", AYUDA_ETAPAS, etapa=nombre, espacio="cubo")
+
+        with etapa("mascara"):
+            mascara = self.indice.mascara(filtros)
+        with etapa("suma_por_anio"):
+            seleccion = self.celdas[mascara]
+            por_anio = seleccion.groupby(COLUMNA_ANIO)[["Observaciones", COLUMNA_AREA]].sum().reset_index()
+
+        with etapa("distintos"):
+            # Las celdas están ordenadas por año: el grupo de cada celda es la posición de su año en `por_anio`
+            celdas = np.flatnonzero(mascara)
+            grupos = np.searchsorted(por_anio[COLUMNA_ANIO].to_numpy(), self._anios[celdas])
+            totales_distintos = {}
+            for columna, distintos in self.distintos.items():
+                por_anio[columna], totales_distintos[columna] = distintos.contar(celdas, grupos, len(por_anio))
+
+        generos = None
+        if self.generos is not None:
+            with etapa("generos"):
+                generos = self.generos[mascara].sum()
+                generos = generos[generos > 0]
+        return ConsultaCubo(por_anio, totales_distintos, generos)
+
+    def agregar(self, filtros, por=(COLUMNA_ANIO,), anio_desde=None, anio_hasta=None):
+        """Totales por combinación de las columnas ``por`` (de CLAVES_CUBO) de las celdas que cumplen los filtros.
+
+        Devuelve ``(filas, totales)``: un DataFrame con las columnas de ``por``, Observaciones, el
+        área, los valores únicos de cada columna de COLUMNAS_DISTINTAS y una columna
+        ``Genero_<valor>`` por género, y un diccionario con los mismos totales para toda la selección.
+        """
+        mascara = self.indice.mascara(filtros)
+        if anio_desde is not None:
+            mascara &= self._anios >= anio_desde
+        if anio_hasta is not None:
+            mascara &= self._anios <= anio_hasta
+        celdas = np.flatnonzero(mascara)
+        agrupado = self.celdas.iloc[celdas].groupby(list(por), observed=True, sort=True)
+        grupos = agrupado.ngroup().to_numpy()
+        filas = agrupado[["Observaciones", COLUMNA_AREA]].sum().reset_index()
+        totales = {"Observaciones": int(filas["Observaciones"].sum()), COLUMNA_AREA: float(filas[COLUMNA_AREA].sum())}
+
+        # Los sketches HyperLogLog esperan las celdas de cada grupo contiguas
+        orden = np.argsort(grupos, kind="stable")
+        for columna, distintos in self.distintos.items():
+            filas[columna], totales[columna] = distintos.contar(celdas[orden], grupos[orden], len(filas))
+
+        if self.generos is not None:
+            generos = self.generos.iloc[celdas].groupby(grupos).sum().reindex(range(len(filas)), fill_value=0)
+            for genero in generos.columns:
+                filas[f"{COLUMNA_GENERO}_{genero}"] = generos[genero].to_numpy()
+                totales[f"{COLUMNA_GENERO}_{genero}"] = int(generos[genero].sum())
+        return filas, totales
@@ -0,0 +1,250 @@
+"""Conteos de valores distintos (parcelas, productores) por celda del cubo.
+
+Los valores únicos no se pueden sumar entre celdas, así que cada celda guarda una
+estructura que sí se puede combinar:
+
+- ``ConjuntosPorCelda`` (modo "exacto"): los códigos enteros de los identificadores
+  presentes en la celda. Combinar es unir conjuntos.
+- ``SketchesHLL`` (modo "aproximado"): un sketch HyperLogLog por celda, disperso (solo los
+  registros no nulos) salvo en las celdas muy llenas. Combinar es tomar el máximo registro a
+  registro; el error relativo estándar es ~1.04/sqrt(2**p).
+
+Ambas clases responden ``contar(celdas, grupos, n_grupos)``: ``celdas`` son las
+posiciones de las celdas seleccionadas y ``grupos`` el número de grupo (año) de cada
+una; se devuelve el conteo por grupo y el conteo total. Con ``combinar`` se juntan las
+estructuras de varios cubos (p. ej. el cubo vigente y el de las filas nuevas de un CSV).
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+MODOS_DISTINTOS = ("exacto", "aproximado")
+
+
+def _hashes(valores):
+    """Hash de 64 bits de cada valor no nulo de una Series y la máscara de los no nulos.
+
+    Para categóricas se hashean solo las categorías; el resultado es el mismo que hashear
+    los valores como texto, así que sketches de distintas fuentes se pueden combinar.
+    """
+    if isinstance(valores.dtype, pd.CategoricalDtype):
+        codigos = valores.cat.codes.to_numpy()
+        validos = codigos >= 0
+        categorias = pd.util.hash_array(np.asarray(valores.cat.categories, dtype=object))
+        return categorias[codigos[validos]], validos
+    validos = valores.notna().to_numpy()
+    return pd.util.hash_array(np.asarray(valores.to_numpy()[validos], dtype=object)), validos
+
+
+def _unicos(claves):
+    """Valores distintos de un arreglo de enteros, ordenados.
+
+    Equivale a ``np.unique``, que en arreglos grandes de int64 es decenas de veces más lento que
+    ordenar en el lugar y quedarse con los cambios.
+    """
+    claves = np.sort(claves)
+    if len(claves) == 0:
+        return claves
+    return claves[np.r_[True, claves[1:] != claves[:-1]]]
+
+
+class ConjuntosPorCelda:
+    """Identificadores distintos de cada celda, en formato CSR (punteros + códigos)."""
+
+    def __init__(self, punteros, codigos, valores):
+        self.punteros = punteros
+        self.codigos = codigos
+        # Identificador original de cada código; se necesita para combinar con otros cubos
+        self.valores = valores
+        self.n_valores = max(len(valores), 1)
+
+    @classmethod
+    def construir(cls, celda_fila, valores, n_celdas):
+        """``celda_fila`` es la celda de cada fila y ``valores`` la Series de identificadores; los nulos se ignoran."""
+        codigos, unicos = pd.factorize(valores)
+        validos = codigos >= 0
+        return cls._desde_pares(celda_fila[validos], codigos[validos], n_celdas, np.asarray(unicos, dtype=object))
+
+    @classmethod
+    def _desde_pares(cls, celdas, codigos, n_celdas, valores):
+        """Construye el CSR a partir de pares (celda, código), posiblemente repetidos."""
+        n_valores = max(len(valores), 1)
+        claves = _unicos(celdas.astype(np.int64) * n_valores + codigos)
+        punteros = np.zeros(n_celdas + 1, dtype=np.int64)
+        np.cumsum(np.bincount(claves // n_valores, minlength=n_celdas), out=punteros[1:])
+        return cls(punteros, (claves % n_valores).astype(np.int32), valores)
+
+    @classmethod
+    def combinar(cls, partes, n_celdas):
+        """Une varios ``(ConjuntosPorCelda, mapa)``, donde ``mapa[i]`` es la celda nueva de la celda ``i``."""
+        valores = pd.Index(np.concatenate([conjuntos.valores for conjuntos, _ in partes])).unique()
+        celdas, codigos = [], []
+        for conjuntos, mapa in partes:
+            recodificacion = valores.get_indexer(conjuntos.valores)
+            celdas.append(np.repeat(mapa, np.diff(conjuntos.punteros)))
+            codigos.append(recodificacion[conjuntos.codigos])
+        return cls._desde_pares(np.concatenate(celdas), np.concatenate(codigos), n_celdas, np.asarray(valores, dtype=object))
+
+    def contar(self, celdas, grupos, n_grupos):
+        inicios = self.punteros[celdas]
+        longitudes = self.punteros[celdas + 1] - inicios
+        desplazamientos = np.repeat(inicios - np.cumsum(longitudes) + longitudes, longitudes)
+        codigos = self.codigos[desplazamientos + np.arange(longitudes.sum())]
+
+        claves = _unicos(np.repeat(grupos, longitudes).astype(np.int64) * self.n_valores + codigos)
+        por_grupo = np.bincount(claves // self.n_valores, minlength=n_grupos)
+
+        marcas = np.zeros(self.n_valores, dtype=bool)
+        marcas[codigos] = True
+        return por_grupo, int(marcas.sum())
+
+    def memoria_bytes(self):
+        """Bytes que ocupan los punteros, los códigos y los identificadores originales."""
+        return self.punteros.nbytes + self.codigos.nbytes + int(pd.Series(self.valores).memory_usage(deep=True, index=False))
+
+
+def _longitud_bits(valores):
+    """``int.bit_length`` vectorizado para enteros sin signo de 64 bits."""
+    valores = valores.copy()
+    longitud = np.zeros(valores.shape, dtype=np.uint8)
+    for desplazamiento in (32, 16, 8, 4, 2, 1):
+        altos = valores >= (np.uint64(1) << np.uint64(desplazamiento))
+        longitud[altos] += desplazamiento
+        valores[altos] >>= np.uint64(desplazamiento)
+    return longitud + (valores > 0)
+
+
+def precision_para_error(error_relativo):
+    """Precisión ``p`` (2**p registros) más pequeña cuyo error estándar no supera ``error_relativo``."""
+    return min(max(math.ceil(math.log2((1.04 / error_relativo) ** 2)), 4), 16)
+
+
+class SketchesHLL:
+    """Un sketch HyperLogLog de ``2**precision`` registros por celda, disperso o denso según su llenado.
+
+    La mayoría de las celdas tiene pocos identificadores y casi todos sus registros en cero: se
+    guardan solo los registros no nulos, en CSR (``punteros`` + ``entradas``, cada entrada
+    ``registro * 64 + rango`` en 4 bytes). Las celdas con más de ``2**precision // 4`` registros no
+    nulos, donde la forma dispersa ya no ahorra, van a una fila densa de ``densos`` (un byte por registro).
+    """
+
+    def __init__(self, punteros, entradas, fila_densa, densos, precision):
+        # CSR de las entradas dispersas por celda (vacío en las celdas densas)
+        self.punteros = punteros
+        self.entradas = entradas
+        # Fila de `densos` de cada celda, o -1 si la celda es dispersa
+        self.fila_densa = fila_densa
+        # Arreglo (celdas densas, 2**precision) de uint8
+        self.densos = densos
+        self.precision = precision
+
+    @classmethod
+    def construir(cls, celda_fila, valores, n_celdas, error_relativo=0.02):
+        precision = precision_para_error(error_relativo)
+        hashes, validos = _hashes(valores)
+
+        bits_resto = 64 - precision
+        registro = (hashes >> np.uint64(bits_resto)).astype(np.int64)
+        resto = hashes & np.uint64((1 << bits_resto) - 1)
+        rango = (bits_resto + 1 - _longitud_bits(resto)).astype(np.uint8)
+        return cls._desde_entradas(celda_fila[validos].astype(np.int64), registro, rango, n_celdas, precision)
+
+    @classmethod
+    def _desde_entradas(cls, celdas, registros, rangos, n_celdas, precision):
+        """Construye los sketches a partir de ternas (celda, registro, rango), posiblemente repetidas."""
+        m = 1 << precision
+        # Por cada (celda, registro) se queda el rango máximo: el último al ordenar por clave y rango
+        claves = celdas * m + registros
+        orden = np.lexsort((rangos, claves))
+        claves = claves[orden]
+        ultimas = np.r_[claves[1:] != claves[:-1], True] if len(claves) else np.zeros(0, dtype=bool)
+        claves = claves[ultimas]
+        rangos = rangos[orden][ultimas]
+        celdas = claves // m
+        registros = claves % m
+
+        llenado = np.bincount(celdas, minlength=n_celdas)
+        es_densa = llenado > m // 4
+        fila_densa = np.full(n_celdas, -1, dtype=np.int32)
+        fila_densa[es_densa] = np.arange(int(es_densa.sum()), dtype=np.int32)
+        densos = np.zeros((int(es_densa.sum()), m), dtype=np.uint8)
+        en_densa = es_densa[celdas]
+        densos[fila_densa[celdas[en_densa]], registros[en_densa]] = rangos[en_densa]
+
+        punteros = np.zeros(n_celdas + 1, dtype=np.int64)
+        np.cumsum(np.where(es_densa, 0, llenado), out=punteros[1:])
+        entradas = (registros[~en_densa].astype(np.uint32) << np.uint32(6)) | rangos[~en_densa].astype(np.uint32)
+        return cls(punteros, entradas, fila_densa, densos, precision)
+
+    def ternas(self, celdas=None):
+        """Ternas (celda, registro, rango) de los registros no nulos de ``celdas`` (por defecto, todas)."""
+        if celdas is None:
+            celdas = np.arange(len(self.fila_densa))
+        inicios = self.punteros[celdas]
+        longitudes = self.punteros[celdas + 1] - inicios
+        desplazamientos = np.repeat(inicios - np.cumsum(longitudes) + longitudes, longitudes)
+        entradas = self.entradas[desplazamientos + np.arange(longitudes.sum())]
+        posiciones = [np.repeat(np.arange(len(celdas)), longitudes)]
+        registros = [(entradas >> np.uint32(6)).astype(np.int64)]
+        rangos = [(entradas & np.uint32(63)).astype(np.uint8)]
+
+        densas = np.flatnonzero(self.fila_densa[celdas] >= 0)
+        filas, registros_densos = np.nonzero(self.densos[self.fila_densa[celdas[densas]]])
+        posiciones.append(densas[filas])
+        registros.append(registros_densos.astype(np.int64))
+        rangos.append(self.densos[self.fila_densa[celdas[densas]][filas], registros_densos])
+        return celdas[np.concatenate(posiciones)].astype(np.int64), np.concatenate(registros), np.concatenate(rangos)
+
+    @classmethod
+    def combinar(cls, partes, n_celdas):
+        """Une varios ``(SketchesHLL, mapa)`` tomando el máximo registro a registro en cada celda nueva."""
+        precision = partes[0][0].precision
+        celdas, registros, rangos = [], [], []
+        for sketches, mapa in partes:
+            if sketches.precision != precision:
+                raise ValueError("No se pueden combinar sketches HyperLogLog de distinta precisión.")
+            celdas_parte, registros_parte, rangos_parte = sketches.ternas()
+            celdas.append(np.asarray(mapa, dtype=np.int64)[celdas_parte])
+            registros.append(registros_parte)
+            rangos.append(rangos_parte)
+        return cls._desde_entradas(
+            np.concatenate(celdas), np.concatenate(registros), np.concatenate(rangos), n_celdas, precision
+        )
+
+    def memoria_bytes(self):
+        """Bytes que ocupan los sketches (entradas dispersas, punteros y filas densas)."""
+        return self.punteros.nbytes + self.entradas.nbytes + self.fila_densa.nbytes + self.densos.nbytes
+
+    def estimar(self, registros):
+        """Estimación HyperLogLog para cada fila de ``registros`` (con corrección de rango pequeño)."""
+        m = registros.shape[-1]
+        alfa = 0.7213 / (1 + 1.079 / m)
+        estimacion = alfa * m * m / np.ldexp(1.0, -registros.astype(np.int32)).sum(axis=-1)
+        ceros = (registros == 0).sum(axis=-1)
+        pequena = (estimacion <= 2.5 * m) & (ceros > 0)
+        estimacion[pequena] = m * np.log(m / ceros[pequena])
+        return np.rint(estimacion).astype(np.int64)
+
+    def contar(self, celdas, grupos, n_grupos):
+        if len(celdas) == 0:
+            return np.zeros(n_grupos, dtype=np.int64), 0
+        m = 1 << self.precision
+        # Máximo por (grupo, registro) sobre los registros no nulos de las celdas seleccionadas
+        posiciones = np.empty(len(self.fila_densa), dtype=np.int64)
+        posiciones[celdas] = grupos
+        celdas_ternas, registros, rangos = self.ternas(celdas)
+        por_grupo = np.zeros(n_grupos * m, dtype=np.uint8)
+        np.maximum.at(por_grupo, posiciones[celdas_ternas] * m + registros, rangos)
+        por_grupo = por_grupo.reshape(n_grupos, m)
+        total = por_grupo.max(axis=0, keepdims=True)
+        return self.estimar(por_grupo), int(self.estimar(total)[0])
+
+
+def construir_distintos(modo, celda_fila, valores, n_celdas, error_relativo=0.02):
+    """Construye la estructura de conteo distinto para el modo pedido ("exacto" o "aproximado")."""
+    if modo == "exacto":
+        return ConjuntosPorCelda.construir(celda_fila, valores, n_celdas)
+    if modo == "aproximado":
+        return SketchesHLL.construir(celda_fila, valores, n_celdas, error_relativo)
+    raise ValueError(f"Modo de conteo distinto desconocido: '{modo}'. Use uno de {MODOS_DISTINTOS}.")
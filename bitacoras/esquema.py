@@ -0,0 +1,41 @@
+"""Nombres de columnas y constantes compartidas por el tablero Dash y la app de Streamlit."""
+
+# Valor de los menús desplegables que desactiva un filtro
+TODOS = "Todos"
+
+# Columnas de los filtros, en el mismo orden que los menús desplegables
+COLUMNAS_FILTRO = ["Categoria_Proyecto", "Ciclo", "Tipo_parcela", "Estado", "Tipo_Regimen_Hidrico"]
+
+COLUMNA_ANIO = "Anio"
+COLUMNA_AREA = "Area_total_de_la_parcela(ha)"
+COLUMNA_PARCELA = "Id_Parcela(Unico)"
+COLUMNA_PRODUCTOR = "Id_Productor"
+COLUMNA_GENERO = "Genero"
+
+# Columnas que deben existir en el CSV de Datos_Historicos
+COLUMNAS_REQUERIDAS = ["Anio", "Categoria_Proyecto", "Ciclo", "Estado", "Tipo_Regimen_Hidrico", "Tipo_parcela", "Area_total_de_la_parcela(ha)"]
+
+# Rango de años que muestran los tableros
+ANIO_INICIO = 2012
+ANIO_FIN = 2025
+
+# Las columnas que usan los tableros se leen como texto para que pandas no tenga que
+# inferir tipos (y no mezcle enteros y cadenas del mismo identificador entre bloques)
+TIPOS_CSV = {
+    columna: str
+    for columna in COLUMNAS_REQUERIDAS + [COLUMNA_PARCELA, COLUMNA_PRODUCTOR, COLUMNA_GENERO]
+}
+
+# Columnas que se guardan como categóricas después de la limpieza
+COLUMNAS_CATEGORICAS = COLUMNAS_FILTRO + [COLUMNA_GENERO]
+
+# Identificadores: también categóricos al compactar (códigos enteros + un arreglo de valores únicos)
+COLUMNAS_IDENTIFICADORES = [COLUMNA_PARCELA, COLUMNA_PRODUCTOR]
+
+# Columnas que lee alguna gráfica; las demás se descartan al compactar
+COLUMNAS_TABLERO = COLUMNAS_REQUERIDAS + COLUMNAS_IDENTIFICADORES + [COLUMNA_GENERO]
+
+
+def armar_filtros(*valores):
+    """Convierte los valores de los cinco menús (en el orden de COLUMNAS_FILTRO) en un diccionario columna -> valor."""
+    return dict(zip(COLUMNAS_FILTRO, valores))
@@ -0,0 +1,182 @@
+"""Figuras del tablero construidas a partir de una consulta al cubo (``ConsultaCubo``)."""
+import json
+
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+
+from .esquema import COLUMNAS_FILTRO, TODOS, armar_filtros
+
+# Posiciones de las figuras dentro de las salidas del tablero (las demás son los textos de los totales)
+POSICIONES_FIGURAS = (0, 2, 4, 6, 8)
+
+# Propiedades de la traza que cambian con los filtros; la plantilla y el layout no cambian
+PROPIEDADES_TRAZA = {"bar": ("x", "y"), "pie": ("labels", "values", "marker")}
+
+
+def grafico_observaciones(consulta):
+    datos_agrupados_filtrados = consulta.por_anio[["Anio", "Observaciones"]]
+
+    fig = px.bar(datos_agrupados_filtrados, x="Anio", y="Observaciones", title="Número de Bitácoras por Año")
+    
+    fig.update_layout(
+        title={
+            "text": "Número de Bitácoras por Año",
+            "font": {"size": 24},  # Cambia el tamaño del título aquí
+            "x": 0.1  
+        }
+    )
+    
+    total_observaciones = datos_agrupados_filtrados["Observaciones"].sum()
+    return fig, f"Total de Bitácoras: {total_observaciones}"
+
+
+def grafico_area(consulta):
+    datos_agrupados_area = consulta.por_anio[["Anio", "Area_total_de_la_parcela(ha)"]]
+    fig = px.bar(
+        datos_agrupados_area,
+        x="Anio",
+        y="Area_total_de_la_parcela(ha)",
+        title="Superficie (ha) de las Parcelas por Año",
+        labels={"Area_total_de_la_parcela(ha)": "Área (ha)"}  # Cambiar etiqueta del eje y
+    )
+    # Cambiar el tamaño del título
+    fig.update_layout(
+        title={
+            "text": "Superficie (ha) de las Parcelas por Año",
+            "font": {"size": 24},  # Cambia el tamaño del título aquí
+            "x": 0.1  # Centra el título horizontalmente
+        }
+    )
+    
+    total_area = datos_agrupados_area["Area_total_de_la_parcela(ha)"].sum()
+    return fig, f"Total de Área (ha): {total_area:.2f}"
+
+
+def grafico_parcelas(consulta):
+    # Valores únicos de Id_Parcela(Unico) por año
+    datos_agrupados_parcelas = consulta.por_anio[["Anio", "Id_Parcela(Unico)"]]
+    fig = px.bar(
+        datos_agrupados_parcelas,
+        x="Anio",
+        y="Id_Parcela(Unico)",
+        title="Número de Parcelas por Año",
+        labels={"Id_Parcela(Unico)": "Parcelas"}
+    )
+
+    # Cambiar el tamaño del título
+    fig.update_layout(
+        title={
+            "text": "Número de Parcelas por Año",
+            "font": {"size": 24},  # Cambia el tamaño del título aquí
+            "x": 0.1  # Centra el título horizontalmente
+        }
+    )
+    total_parcelas = consulta.totales_distintos["Id_Parcela(Unico)"]
+    return fig, f"Total de Parcelas: {total_parcelas}"
+
+
+def grafico_productores(consulta):
+    # Valores únicos de Id_Productor por año
+    datos_agrupados_productores = consulta.por_anio[["Anio", "Id_Productor"]]
+    fig = px.bar(
+        datos_agrupados_productores,
+        x="Anio",
+        y="Id_Productor",
+        title="Número de Productores por Año.",
+        labels={"Id_Productor": "Productores"}
+    )
+    # Cambiar el tamaño del título
+    fig.update_layout(
+        title={
+            "text": "Número de Productores por Año",
+            "font": {"size": 24},  # Cambia el tamaño del título aquí
+            "x": 0.1  # Centra el título horizontalmente
+        }
+    )
+
+    total_productores = consulta.totales_distintos["Id_Productor"]
+    return fig, f"Total de Productores: {total_productores}"
+
+
+def grafico_genero(consulta):
+    # Calcular el porcentaje por género
+    if consulta.generos is None:
+        return {}
+
+    datos_genero = consulta.generos.rename_axis("Genero").reset_index(name="Registros")
+    datos_genero["Porcentaje"] = (datos_genero["Registros"] / datos_genero["Registros"].sum()) * 100
+
+    # Definir colores fijos para cada género
+    colores_fijos = {
+        "Masculino": "#2ca02c",
+        "Femenino": "#ff7f0e",
+        "NA..": "#D3D3D3"
+    }
+
+    # Crear la gráfica
+    fig = px.pie(
+        datos_genero,
+        names="Genero",
+        values="Porcentaje",
+        title="Distribución (%) por Género de Productores(as)",
+        labels={"Genero": "Género", "Porcentaje": "Porcentaje"}
+    )
+    # Cambiar el tamaño del título
+    fig.update_layout(
+        title={
+            "text": "Distribución (%) por Género de Productores(as)",
+            "font": {"size": 24},  # Cambia el tamaño del título aquí
+            "x": 0.1  # Centra el título horizontalmente
+        }
+    )
+    # Aplicar los colores fijos
+    fig.update_traces(marker=dict(colors=[colores_fijos.get(genero, "#7f7f7f") for genero in datos_genero["Genero"]]))
+
+    return fig
+
+
+def salidas_tablero(consulta):
+    """Las nueve salidas del callback del tablero: cuatro pares (figura, total) y la gráfica de género."""
+    return (
+        *grafico_observaciones(consulta),
+        *grafico_area(consulta),
+        *grafico_parcelas(consulta),
+        *grafico_productores(consulta),
+        grafico_genero(consulta)
+    )
+
+
+def trazas_tablero(consulta):
+    """Como ``salidas_tablero``, pero cada figura se reduce a las propiedades de su traza que dependen de
+    los filtros (``PROPIEDADES_TRAZA``); la figura de género sin datos de Genero queda como ``{}``."""
+    salidas = list(salidas_tablero(consulta))
+    for posicion in POSICIONES_FIGURAS:
+        if isinstance(salidas[posicion], go.Figure):
+            traza = salidas[posicion].data[0]
+            salidas[posicion] = {propiedad: traza[propiedad] for propiedad in PROPIEDADES_TRAZA[traza.type]}
+    return salidas
+
+
+def figuras_sin_filtros(cubo):
+    """Las cinco figuras de la vista sin filtros, ya serializadas (plantillas de los modos ligero y cliente)."""
+    salidas = salidas_tablero(cubo.consultar(armar_filtros(*[TODOS] * len(COLUMNAS_FILTRO))))
+    return json.loads(to_json_plotly([salidas[posicion] for posicion in POSICIONES_FIGURAS]))
+
+
+def opciones_menus(facetas, filtros):
+    """Opciones de los cinco menús (en el orden de COLUMNAS_FILTRO) a partir de ``cubo.facetas(filtros)``.
+
+    Cada menú lista solo los valores que aún tienen bitácoras con los otros filtros, con su conteo
+    (p. ej. "Jalisco (12,345)"); el valor seleccionado se conserva aunque quede en cero.
+    """
+    opciones = []
+    for columna in COLUMNAS_FILTRO:
+        conteos = facetas[columna]
+        menu = [{"label": f"{TODOS} ({sum(conteos.values()):,})", "value": TODOS}]
+        menu += [
+            {"label": f"{valor} ({conteo:,})", "value": valor}
+            for valor, conteo in conteos.items() if conteo > 0 or valor == filtros[columna]
+        ]
+        opciones.append(menu)
+    return opciones
@@ -0,0 +1,65 @@
+"""Índice invertido de mapas de bits sobre las columnas de los filtros.
+
+Para cada par (columna, valor) se guarda, empaquetado con ``np.packbits``, el mapa de
+bits de las filas que tienen ese valor. Una combinación de filtros se resuelve con un
+AND de a lo más cinco mapas; los filtros en "Todos" no participan.
+"""
+import numpy as np
+import pandas as pd
+
+from .esquema import COLUMNAS_FILTRO, TODOS
+
+try:
+    _contar_bits = np.bitwise_count  # NumPy >= 2.0
+except AttributeError:  # pragma: no cover - NumPy 1.x
+    _TABLA_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+    def _contar_bits(arreglo):
+        return _TABLA_BITS[arreglo]
+
+
+class IndiceBitmap:
+    """Mapas de bits precalculados por (columna, valor) para un conjunto fijo de filas."""
+
+    def __init__(self, n_filas, mapas):
+        self.n_filas = n_filas
+        # {columna: {valor: arreglo uint8 empaquetado}}
+        self.mapas = mapas
+        self._vacio = np.zeros((n_filas + 7) // 8, dtype=np.uint8)
+
+    @classmethod
+    def construir(cls, datos, columnas=COLUMNAS_FILTRO):
+        """Construye el índice a partir de las columnas indicadas de un DataFrame."""
+        mapas = {}
+        for columna in columnas:
+            codigos, valores = pd.factorize(datos[columna], use_na_sentinel=False)
+            mapas[columna] = {valor: np.packbits(codigos == codigo) for codigo, valor in enumerate(valores)}
+        return cls(len(datos), mapas)
+
+    def valores(self, columna):
+        """Valores distintos de una columna, en orden de aparición."""
+        return list(self.mapas[columna])
+
+    def seleccionar(self, filtros):
+        """Mapa de bits empaquetado de las filas que cumplen los filtros, o None si todos están en "Todos"."""
+        resultado = None
+        for columna, valor in filtros.items():
+            if valor == TODOS:
+                continue
+            mapa = self.mapas[columna].get(valor, self._vacio)
+            resultado = mapa.copy() if resultado is None else np.bitwise_and(resultado, mapa, out=resultado)
+        return resultado
+
+    def mascara(self, filtros):
+        """Máscara booleana de longitud ``n_filas`` para los filtros dados."""
+        bits = self.seleccionar(filtros)
+        if bits is None:
+            return np.ones(self.n_filas, dtype=bool)
+        return np.unpackbits(bits, count=self.n_filas).view(bool)
+
+    def contar(self, filtros):
+        """Número de filas que cumplen los filtros, sin desempaquetar el mapa de bits."""
+        bits = self.seleccionar(filtros)
+        if bits is None:
+            return self.n_filas
+        return int(_contar_bits(bits).sum())
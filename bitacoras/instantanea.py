@@ -0,0 +1,119 @@
+"""Instantánea de los datos lista para servir: el cubo y la versión del CSV del que salió.
+
+``cargar_instantanea`` hace todo el trabajo pesado de arranque (leer o mapear la caché
+Feather, construir el cubo, sus índices y los conteos distintos) y descarta el DataFrame
+de filas: lo que queda vive en arreglos de NumPy, que después de un ``fork`` se comparten
+por copy-on-write sin que los conteos de referencias de Python toquen sus páginas.
+
+Con ``filas_por_bloque`` el CSV se lee por bloques y cada uno se agrega directamente en el
+cubo: la memoria pico queda acotada por el tamaño del bloque (no se usa la caché Feather).
+Con ``procesos`` mayor que 1 el CSV se reparte por rangos de bytes entre un pool de
+procesos (ver ``paralelo``); tampoco usa la caché Feather.
+
+Con ``motor`` "sqlite" o "duckdb" las bitácoras se guardan en una base embebida y las
+consultas se resuelven en SQL en lugar de en el cubo (ver ``sql``).
+"""
+import datetime
+import logging
+import os
+from dataclasses import dataclass
+
+from .carga import FILAS_POR_BLOQUE, cargar_datos, clave_archivo, fecha_instantanea, leer_csv_por_bloques, sha256_prefijo
+from .cubo import CuboAgregado
+from .distintos import precision_para_error
+from .esquema import ANIO_INICIO
+from .paralelo import construir_en_paralelo
+from .sql import MOTORES_SQL, TablaSQL
+
+# Dónde viven los datos agregados: el cubo en memoria o una base SQL embebida
+MOTORES = ("cubo",) + MOTORES_SQL
+
+logger = logging.getLogger(__name__)
+
+MESES = ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"]
+
+
+@dataclass
+class Instantanea:
+    """Datos agregados de un CSV de Datos_Historicos."""
+
+    archivo: str
+    # Clave del CSV (ver ``clave_archivo``); identifica la instantánea en las cachés
+    version: str
+    # CuboAgregado, o TablaSQL con los motores SQL (las dos responden a consultar, agregar y valores)
+    cubo: CuboAgregado | TablaSQL
+    # Fecha de corte tomada del nombre del archivo (None si no la trae)
+    fecha: datetime.date | None = None
+    # Bytes del CSV que ya están agregados en el cubo
+    tamano: int = 0
+    # Cómo se construyeron los agregados (ver ``configuracion_de``); dos configuraciones distintas del
+    # mismo CSV dan resultados distintos, así que no comparten cachés
+    configuracion: str = ""
+    # SHA-256 de esos ``tamano`` bytes, tomado al cargarlos (solo con el cubo, que es el que admite recargas
+    # incrementales); permite ver si el CSV solo creció o si también se reescribió lo ya cargado
+    huella: str | None = None
+
+    @property
+    def clave_cache(self):
+        """Versión del CSV y configuración: la clave de las cachés de figuras y de la API."""
+        return f"{self.version}-{self.configuracion}" if self.configuracion else self.version
+
+    @property
+    def anios(self):
+        """Primer y último año con datos."""
+        rango = self.cubo.rango_anios()
+        if rango is None:
+            return ANIO_INICIO, self.fecha.year if self.fecha else ANIO_INICIO
+        return rango
+
+    @property
+    def titulo(self):
+        """Título del tablero, p. ej. "Datos Históricos 2012-marzo2025. Bitácoras Agronómicas"."""
+        inicio, fin = self.anios
+        corte = f"{MESES[self.fecha.month - 1]}{self.fecha.year}" if self.fecha else str(fin)
+        return f"Datos Históricos {inicio}-{corte}. Bitácoras Agronómicas"
+
+
+def configuracion_de(motor="cubo", modo_distintos="exacto", error_hll=0.02):
+    """Etiqueta corta de la configuración de carga: el motor y, con el cubo, el modo de conteo distinto
+    (y la precisión del HyperLogLog, que es lo que cambia los resultados), p. ej. "cubo-exacto" o "cubo-hll12"."""
+    if motor != "cubo":
+        return motor
+    if modo_distintos == "aproximado":
+        return f"cubo-hll{precision_para_error(error_hll)}"
+    return f"cubo-{modo_distintos}"
+
+
+def cargar_instantanea(archivo, modo_distintos="exacto", error_hll=0.02, directorio_cache=None, filas_por_bloque=None,
+                       procesos=None, motor="cubo"):
+    """Carga el CSV (o su caché Feather, por bloques o en paralelo) y construye el cubo; las filas no se conservan.
+
+    Con un ``motor`` SQL abre (o construye por bloques) la base de esa versión del CSV; ``modo_distintos`` y
+    ``procesos`` no aplican.
+    """
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconocido: '{motor}'. Use uno de {MOTORES}.")
+    # Versión, tamaño y huella se toman antes de leer: si el CSV cambia durante la carga, la siguiente revisión lo nota
+    # (la huella ya no coincide y se recarga todo)
+    version = clave_archivo(archivo)
+    tamano = os.path.getsize(archivo)
+    huella = sha256_prefijo(archivo, tamano).hexdigest() if motor == "cubo" else None
+    if motor in MOTORES_SQL:
+        cubo = TablaSQL.cargar(archivo, motor, directorio_cache, filas_por_bloque or FILAS_POR_BLOQUE)
+    elif procesos and procesos > 1:
+        cubo = construir_en_paralelo(archivo, procesos, modo_distintos=modo_distintos, error_hll=error_hll)
+    elif filas_por_bloque:
+        bloques = leer_csv_por_bloques(archivo, filas_por_bloque)
+        cubo = CuboAgregado.construir_por_bloques(bloques, modo_distintos=modo_distintos, error_hll=error_hll)
+    else:
+        datos = cargar_datos(archivo, directorio_cache=directorio_cache)
+        cubo = CuboAgregado.construir(datos, modo_distintos=modo_distintos, error_hll=error_hll)
+    if isinstance(cubo, CuboAgregado):
+        # El costo de los conteos distintos depende del modo (y, en el aproximado, de la precisión del HLL)
+        memoria = cubo.memoria_mb()
+        logger.info(
+            "Cubo de %s con %d celdas (%s): %s", archivo, len(cubo.celdas), modo_distintos,
+            ", ".join(f"{componente} {mb:.1f} MB" for componente, mb in memoria.items())
+        )
+    configuracion = configuracion_de(motor, modo_distintos, error_hll)
+    return Instantanea(archivo, version, cubo, fecha_instantanea(archivo), tamano, configuracion, huella)
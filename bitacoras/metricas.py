@@ -0,0 +1,305 @@
+"""Métricas de latencia del tablero en el formato de texto de Prometheus y perfilado de peticiones lentas.
+
+Todo es opcional: sin un ``RegistroMetricas`` los tiempos no se toman (``cronometro`` devuelve
+un contexto vacío). Con uno, ``instalar_metricas`` agrega al servidor Flask de una app de Dash:
+
+- Un histograma de la duración de cada petición a las rutas medidas (el callback de Dash y la
+  API), además de los de las etapas que registre el propio callback (consulta al cubo, figuras,
+  serialización) y los conteos de bitácoras seleccionadas.
+- ``/metrics`` con todo en el formato de texto de Prometheus: cada histograma con sus cubetas,
+  más un resumen con los cuantiles 0.5, 0.95 y 0.99 de las últimas observaciones, y las métricas
+  de los recolectores (p. ej. los aciertos de las cachés).
+- Con un ``PerfiladorLento``, cada petición medida corre bajo cProfile y el perfil de las que
+  pasan del umbral se guarda en disco (``python -m pstats`` o snakeviz lo abren).
+
+Cada worker de gunicorn tiene su propio registro, así que ``/metrics`` describe al worker que
+responde; Prometheus distingue los workers por la etiqueta ``pid``.
+"""
+import bisect
+import cProfile
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+from flask import Response, g, request
+
+logger = logging.getLogger(__name__)
+
+# Cubetas de los histogramas de tiempos (segundos) y de conteos (bitácoras)
+CUBETAS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CUBETAS_CONTEOS = (0, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+CUANTILES = (0.5, 0.95, 0.99)
+# Observaciones recientes con que se calculan los cuantiles de cada serie
+VENTANA_CUANTILES = 1024
+
+# Histograma común de las etapas del callback, con las etiquetas `etapa` y `espacio` (el de la caché)
+AYUDA_ETAPAS = "Duración de cada etapa del callback del tablero"
+
+TIPO_CONTENIDO_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histograma:
+    """Conteos acumulados por cubeta, suma y total, y una ventana de observaciones para los cuantiles."""
+
+    def __init__(self, cubetas):
+        self.cubetas = cubetas
+        self.conteos = [0] * (len(cubetas) + 1)
+        self.suma = 0.0
+        self.total = 0
+        self.recientes = deque(maxlen=VENTANA_CUANTILES)
+
+    def observar(self, valor):
+        self.conteos[bisect.bisect_left(self.cubetas, valor)] += 1
+        self.suma += valor
+        self.total += 1
+        self.recientes.append(valor)
+
+    def cuantiles(self):
+        """{cuantil: valor} sobre las observaciones recientes (método del rango más cercano)."""
+        ordenados = sorted(self.recientes)
+        if not ordenados:
+            return {cuantil: math.nan for cuantil in CUANTILES}
+        return {cuantil: ordenados[max(math.ceil(cuantil * len(ordenados)) - 1, 0)] for cuantil in CUANTILES}
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(etiquetas, extra=None):
+    """Etiquetas en el formato de Prometheus: ``etiquetas`` son pares ordenados y ``extra`` un diccionario."""
+    pares = list(etiquetas) + list((extra or {}).items())
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in pares) + "}"
+
+
+def _numero(valor):
+    if isinstance(valor, float):
+        if math.isnan(valor):
+            return "NaN"
+        if math.isinf(valor):
+            return "+Inf" if valor > 0 else "-Inf"
+        return repr(valor)
+    return str(valor)
+
+
+class RegistroMetricas:
+    """Histogramas y contadores con etiquetas, seguros entre hilos, y su exposición para Prometheus."""
+
+    def __init__(self, prefijo="bitacoras"):
+        self.prefijo = prefijo
+        # {nombre: (ayuda, cubetas, {etiquetas ordenadas: Histograma})}
+        self._histogramas = {}
+        # {nombre: (ayuda, {etiquetas ordenadas: valor})}
+        self._contadores = {}
+        # Funciones que devuelven métricas calculadas al momento de leerlas
+        self._recolectores = []
+        self._candado = threading.Lock()
+
+    def observar(self, nombre, valor, ayuda="", cubetas=CUBETAS_SEGUNDOS, **etiquetas):
+        """Agrega ``valor`` al histograma ``nombre`` con las etiquetas dadas."""
+        with self._candado:
+            _, cubetas_familia, series = self._histogramas.setdefault(nombre, (ayuda, cubetas, {}))
+            clave = tuple(sorted(etiquetas.items()))
+            if clave not in series:
+                series[clave] = Histograma(cubetas_familia)
+            series[clave].observar(valor)
+
+    def incrementar(self, nombre, valor=1, ayuda="", **etiquetas):
+        """Suma ``valor`` al contador ``nombre`` con las etiquetas dadas."""
+        with self._candado:
+            _, series = self._contadores.setdefault(nombre, (ayuda, {}))
+            clave = tuple(sorted(etiquetas.items()))
+            series[clave] = series.get(clave, 0) + valor
+
+    @contextmanager
+    def cronometrar(self, nombre, ayuda="", **etiquetas):
+        """Contexto que observa en el histograma ``nombre`` los segundos que tarda su bloque."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nombre, time.perf_counter() - inicio, ayuda, **etiquetas)
+
+    def agregar_recolector(self, recolector):
+        """Registra una función que devuelve tuplas ``(nombre, tipo, ayuda, etiquetas, valor)`` al leer las métricas.
+
+        ``tipo`` es "counter" o "gauge"; ``etiquetas`` un diccionario.
+        """
+        self._recolectores.append(recolector)
+
+    def resumen(self):
+        """{nombre: {etiquetas: {"total", "suma", "p50", "p95", "p99"}}} de los histogramas, para inspección."""
+        with self._candado:
+            return {
+                nombre: {
+                    ",".join(f"{clave}={valor}" for clave, valor in etiquetas): {
+                        "total": histograma.total,
+                        "suma": histograma.suma,
+                        **{f"p{round(cuantil * 100)}": valor for cuantil, valor in histograma.cuantiles().items()},
+                    }
+                    for etiquetas, histograma in series.items()
+                }
+                for nombre, (_, _, series) in self._histogramas.items()
+            }
+
+    def texto(self):
+        """Todas las métricas en el formato de texto de exposición de Prometheus (versión 0.0.4)."""
+        lineas = []
+        pid = {"pid": os.getpid()}
+        with self._candado:
+            for nombre, (ayuda, cubetas, series) in sorted(self._histogramas.items()):
+                completo = f"{self.prefijo}_{nombre}"
+                lineas += [f"# HELP {completo} {ayuda}", f"# TYPE {completo} histogram"]
+                for etiquetas, histograma in series.items():
+                    acumulado = 0
+                    for limite, conteo in zip(list(cubetas) + [math.inf], histograma.conteos):
+                        acumulado += conteo
+                        lineas.append(f"{completo}_bucket{_etiquetas(etiquetas, {**pid, 'le': _numero(float(limite))})} {acumulado}")
+                    lineas.append(f"{completo}_sum{_etiquetas(etiquetas, pid)} {_numero(histograma.suma)}")
+                    lineas.append(f"{completo}_count{_etiquetas(etiquetas, pid)} {histograma.total}")
+
+                # Cuantiles de la ventana reciente, como un resumen aparte
+                reciente = f"{completo}_reciente"
+                lineas += [f"# HELP {reciente} Cuantiles de las últimas {VENTANA_CUANTILES} observaciones de {completo}",
+                           f"# TYPE {reciente} summary"]
+                for etiquetas, histograma in series.items():
+                    for cuantil, valor in histograma.cuantiles().items():
+                        lineas.append(f"{reciente}{_etiquetas(etiquetas, {**pid, 'quantile': cuantil})} {_numero(valor)}")
+                    lineas.append(f"{reciente}_sum{_etiquetas(etiquetas, pid)} {_numero(float(sum(histograma.recientes)))}")
+                    lineas.append(f"{reciente}_count{_etiquetas(etiquetas, pid)} {len(histograma.recientes)}")
+
+            for nombre, (ayuda, series) in sorted(self._contadores.items()):
+                completo = f"{self.prefijo}_{nombre}"
+                lineas += [f"# HELP {completo} {ayuda}", f"# TYPE {completo} counter"]
+                for etiquetas, valor in series.items():
+                    lineas.append(f"{completo}{_etiquetas(etiquetas, pid)} {_numero(valor)}")
+            recolectores = list(self._recolectores)
+
+        familias = {}
+        for recolector in recolectores:
+            try:
+                for nombre, tipo, ayuda, etiquetas, valor in recolector():
+                    familias.setdefault(nombre, (tipo, ayuda, []))[2].append((etiquetas, valor))
+            except Exception:
+                logger.warning("Falló un recolector de métricas", exc_info=True)
+        for nombre, (tipo, ayuda, muestras) in sorted(familias.items()):
+            completo = f"{self.prefijo}_{nombre}"
+            lineas += [f"# HELP {completo} {ayuda}", f"# TYPE {completo} {tipo}"]
+            for etiquetas, valor in muestras:
+                lineas.append(f"{completo}{_etiquetas(tuple(sorted(etiquetas.items())), pid)} {_numero(valor)}")
+        return "\n".join(lineas) + "\n"
+
+
+def cronometro(registro, nombre, ayuda="", **etiquetas):
+    """``registro.cronometrar(...)``, o un contexto que no hace nada si no hay registro."""
+    if registro is None:
+        return nullcontext()
+    return registro.cronometrar(nombre, ayuda, **etiquetas)
+
+
+def metricas_cache(cache):
+    """Recolector con los aciertos, fallos, tasa de aciertos y ocupación de una ``CacheFiguras``."""
+    def recolectar():
+        estadisticas = cache.estadisticas()
+        etiquetas = {"espacio": cache.espacio}
+        return [
+            ("cache_aciertos_total", "counter", "Aciertos de la caché local", etiquetas, estadisticas["aciertos"]),
+            ("cache_aciertos_compartidos_total", "counter", "Aciertos del almacén compartido", etiquetas,
+             estadisticas["aciertos_compartidos"]),
+            ("cache_fallos_total", "counter", "Consultas calculadas de nuevo", etiquetas, estadisticas["fallos"]),
+            ("cache_tasa_aciertos", "gauge", "Aciertos (locales y compartidos) entre consultas", etiquetas,
+             estadisticas["tasa_aciertos"]),
+            ("cache_entradas", "gauge", "Entradas en la caché local", etiquetas, estadisticas["entradas"]),
+        ]
+
+    return recolectar
+
+
+class PerfiladorLento:
+    """Perfila peticiones con cProfile y guarda en ``directorio`` el perfil de las que tardan ``umbral`` segundos o más.
+
+    Guarda a lo sumo ``maximo`` perfiles por proceso (None: sin límite). cProfile no admite dos
+    perfiles activos a la vez, así que mientras una petición se perfila las demás corren sin perfil.
+    """
+
+    def __init__(self, directorio, umbral=0.5, maximo=1):
+        self.directorio = directorio
+        self.umbral = umbral
+        self.maximo = maximo
+        self.guardados = []
+        self._ocupado = threading.Lock()
+
+    @property
+    def activo(self):
+        return self.maximo is None or len(self.guardados) < self.maximo
+
+    def iniciar(self):
+        """Empieza a perfilar la petición en curso; devuelve el perfil, o None si no se perfila."""
+        if not self.activo or not self._ocupado.acquire(blocking=False):
+            return None
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Otro perfilador (p. ej. un depurador) ya está activo en el proceso
+            self._ocupado.release()
+            return None
+        return perfil, time.perf_counter()
+
+    def terminar(self, iniciado, nombre):
+        """Detiene el perfil de ``iniciar`` y lo guarda si la petición pasó del umbral; devuelve la ruta o None."""
+        if iniciado is None:
+            return None
+        perfil, inicio = iniciado
+        perfil.disable()
+        self._ocupado.release()
+        segundos = time.perf_counter() - inicio
+        if segundos < self.umbral or not self.activo:
+            return None
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = os.path.join(
+            self.directorio,
+            f"{nombre.strip('/').replace('/', '_') or 'raiz'}_{time.strftime('%Y%m%d-%H%M%S')}_{os.getpid()}_{segundos * 1e3:.0f}ms.prof"
+        )
+        perfil.dump_stats(ruta)
+        self.guardados.append(ruta)
+        logger.warning("Petición lenta (%.0f ms): perfil guardado en %s", segundos * 1e3, ruta)
+        return ruta
+
+
+def instalar_metricas(app, registro, rutas, perfilador=None):
+    """Mide la duración de las peticiones a ``rutas`` del servidor de ``app`` y expone ``/metrics``.
+
+    Con ``perfilador`` (un ``PerfiladorLento``) esas peticiones además se perfilan.
+    """
+    servidor = app.server
+
+    @servidor.before_request
+    def iniciar_medicion():
+        if request.path in rutas:
+            g.inicio_metricas = time.perf_counter()
+            g.perfil = perfilador.iniciar() if perfilador is not None else None
+
+    @servidor.teardown_request
+    def terminar_medicion(error=None):
+        inicio = g.pop("inicio_metricas", None)
+        if inicio is None:
+            return
+        registro.observar(
+            "peticion_segundos", time.perf_counter() - inicio, "Duración de las peticiones por ruta", ruta=request.path
+        )
+        if perfilador is not None:
+            perfilador.terminar(g.pop("perfil", None), request.path)
+
+    @servidor.route("/metrics")
+    def metricas():
+        return Response(registro.texto(), content_type=TIPO_CONTENIDO_PROMETHEUS)
+
+    return registro
@@ -0,0 +1,86 @@
+"""Construcción del cubo en paralelo, repartiendo el CSV por rangos de bytes entre procesos.
+
+El archivo se corta en partes de ~``bytes_por_parte`` bytes alineadas al inicio de una
+línea; cada proceso lee, limpia y agrega su parte en un cubo parcial (conteos, sumas de
+área, conjuntos o sketches de identificadores por celda) y el proceso principal los
+combina en orden con ``CuboAgregado.combinar``. El corte depende solo del tamaño del
+archivo y de ``bytes_por_parte``, no del número de procesos, así que el resultado es el
+mismo con 1 o con 32 procesos.
+
+Supone, como el export de Datos_Historicos, que ningún campo entre comillas contiene
+saltos de línea.
+"""
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from .carga import TIPOS_CSV, anio_final, leer_encabezado, limpiar_datos
+from .cubo import CuboAgregado
+from .esquema import ANIO_INICIO, COLUMNAS_TABLERO
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de cada parte: acota la memoria de cada proceso (bytes leídos más su DataFrame)
+BYTES_POR_PARTE = 64 * 1024 * 1024
+
+
+def rangos_bytes(archivo, bytes_por_parte=BYTES_POR_PARTE):
+    """Rangos ``(inicio, fin)`` que cubren el archivo sin el encabezado, cortados al inicio de una línea."""
+    tamano = os.path.getsize(archivo)
+    with open(archivo, "rb") as f:
+        f.readline()
+        limites = [f.tell()]
+        while limites[-1] + bytes_por_parte < tamano:
+            f.seek(limites[-1] + bytes_por_parte)
+            f.readline()
+            if f.tell() >= tamano:
+                break
+            limites.append(f.tell())
+    limites.append(tamano)
+    return [(inicio, fin) for inicio, fin in zip(limites[:-1], limites[1:]) if fin > inicio]
+
+
+def _construir_parte(archivo, inicio, fin, columnas, anio_inicio, anio_fin, modo_distintos, error_hll):
+    """Lee, limpia y agrega un rango de bytes del CSV (corre en un proceso del pool)."""
+    with open(archivo, "rb") as f:
+        f.seek(inicio)
+        contenido = f.read(fin - inicio)
+    usadas = [columna for columna in columnas if columna in COLUMNAS_TABLERO]
+    tipos = {columna: tipo for columna, tipo in TIPOS_CSV.items() if columna in usadas}
+    datos = pd.read_csv(io.BytesIO(contenido), header=None, names=columnas, usecols=usadas, dtype=tipos)
+    del contenido
+    datos = limpiar_datos(datos, anio_inicio, anio_fin)
+    return CuboAgregado.construir(datos, modo_distintos=modo_distintos, error_hll=error_hll)
+
+
+def construir_en_paralelo(archivo, procesos=None, modo_distintos="exacto", error_hll=0.02,
+                          bytes_por_parte=BYTES_POR_PARTE, anio_inicio=ANIO_INICIO, anio_fin=None):
+    """Construye el cubo del CSV con ``procesos`` procesos (por defecto, uno por núcleo).
+
+    Lanza FileNotFoundError si el CSV no existe y ValueError si le faltan columnas.
+    """
+    columnas = list(leer_encabezado(archivo))
+    if anio_fin is None:
+        anio_fin = anio_final(archivo)
+    procesos = procesos or os.cpu_count() or 1
+    rangos = rangos_bytes(archivo, bytes_por_parte)
+    argumentos = [
+        (archivo, inicio, fin, columnas, anio_inicio, anio_fin, modo_distintos, error_hll)
+        for inicio, fin in rangos
+    ]
+    if not argumentos:
+        # Solo el encabezado: un cubo vacío con las columnas esperadas
+        vacio = limpiar_datos(pd.DataFrame({columna: pd.Series(dtype=object) for columna in columnas}), anio_inicio, anio_fin)
+        return CuboAgregado.construir(vacio, modo_distintos=modo_distintos, error_hll=error_hll)
+
+    logger.info("Construyendo el cubo de %s en %d partes con %d procesos", archivo, len(rangos), procesos)
+    if procesos == 1 or len(argumentos) == 1:
+        parciales = (_construir_parte(*parte) for parte in argumentos)
+        return CuboAgregado.plegar(parciales)
+    with ProcessPoolExecutor(max_workers=min(procesos, len(argumentos))) as pool:
+        # ``map`` entrega los cubos parciales en el orden de las partes a medida que terminan
+        parciales = pool.map(_construir_parte, *zip(*argumentos))
+        return CuboAgregado.plegar(parciales)
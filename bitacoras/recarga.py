@@ -0,0 +1,186 @@
+"""Recarga en caliente de nuevas instantáneas de Datos_Historicos sin reiniciar el servidor.
+
+``VigilanteDatos`` revisa periódicamente un directorio, elige el CSV más reciente (por la
+fecha de corte de su nombre) y, si no es el que se está sirviendo, construye la nueva
+instantánea en segundo plano y la publica en una ``FuenteDatos`` con una sola asignación,
+así que las peticiones en curso terminan con la instantánea anterior.
+
+Cuando el CSV nuevo solo agrega filas al final del vigente (mismo contenido hasta el
+tamaño ya cargado, p. ej. un mes más de bitácoras), solo se leen las filas nuevas y su
+cubo se combina con el vigente en lugar de recalcular todo.
+"""
+import datetime
+import glob
+import io
+import logging
+import os
+import threading
+
+import pandas as pd
+
+from .carga import (
+    TIPOS_CSV,
+    anio_final,
+    clave_archivo,
+    compactar_datos,
+    fecha_instantanea,
+    limpiar_cache,
+    limpiar_datos,
+    sha256_prefijo,
+    validar_columnas,
+)
+from .cubo import CuboAgregado
+from .instantanea import Instantanea, cargar_instantanea
+from .sql import EXTENSIONES
+
+logger = logging.getLogger(__name__)
+
+PATRON_INSTANTANEAS = "Datos_Historicos_cuenta_al*.csv"
+
+
+class FuenteDatos:
+    """Referencia a la instantánea vigente; reemplazarla es atómico (una asignación de atributo)."""
+
+    def __init__(self, instantanea):
+        self.actual = instantanea
+        self._suscriptores = []
+        # Se toma mientras se publica una instantánea (y sus suscriptores corren); ver gunicorn.conf.py,
+        # donde el maestro no hace ``fork`` de un worker a mitad de una publicación
+        self.candado = threading.Lock()
+
+    def suscribir(self, funcion):
+        """Registra ``funcion(instantanea)`` para que se llame cada vez que cambie la instantánea."""
+        self._suscriptores.append(funcion)
+
+    def reemplazar(self, instantanea):
+        with self.candado:
+            self.actual = instantanea
+            for funcion in self._suscriptores:
+                try:
+                    funcion(instantanea)
+                except Exception:
+                    logger.exception("Falló un suscriptor de la recarga de datos")
+
+
+def buscar_instantanea_reciente(directorio, patron=PATRON_INSTANTANEAS):
+    """CSV más reciente del directorio: mayor fecha de corte en el nombre y, a igual fecha, el modificado al último."""
+    archivos = glob.glob(os.path.join(directorio, patron))
+    return max(
+        archivos,
+        key=lambda archivo: (fecha_instantanea(archivo) or datetime.date.min, os.path.getmtime(archivo)),
+        default=None
+    )
+
+
+def cargar_incremental(actual, archivo, modo_distintos="exacto", error_hll=0.02):
+    """Instantánea de ``archivo`` combinando el cubo vigente con el de sus filas nuevas.
+
+    Devuelve None si ``archivo`` no es el CSV vigente con filas agregadas al final (sus
+    primeros ``actual.tamano`` bytes no coinciden con ``actual.huella``, o cambia el rango
+    de años), o si los datos vigentes no están en un cubo en memoria; en ese caso hay que
+    recargar todo.
+    """
+    tamano = os.path.getsize(archivo)
+    if (
+        not isinstance(actual.cubo, CuboAgregado)
+        or not actual.tamano
+        or not actual.huella
+        or tamano <= actual.tamano
+        or anio_final(archivo) != anio_final(actual.archivo)
+    ):
+        return None
+
+    version = clave_archivo(archivo)
+    with open(archivo, "rb") as f:
+        encabezado = f.readline()
+        f.seek(0)
+        # La huella de la instantánea vigente se tomó al cargarla, sobre los bytes que de verdad están en el cubo
+        huella = sha256_prefijo(f, actual.tamano)
+        if huella.hexdigest() != actual.huella:
+            return None
+        f.seek(actual.tamano - 1)
+        if f.read(1) != b"\n":
+            return None
+        nuevos = f.read()
+    # Si el archivo se sigue escribiendo, la última línea puede estar incompleta: se deja para la siguiente revisión
+    nuevos = nuevos[:nuevos.rfind(b"\n") + 1]
+    if not nuevos:
+        return None
+    huella.update(nuevos)
+
+    filas = pd.read_csv(io.BytesIO(encabezado + nuevos), dtype=TIPOS_CSV, low_memory=False)
+    validar_columnas(filas.columns)
+    filas = compactar_datos(limpiar_datos(filas, anio_fin=anio_final(archivo)))
+
+    cubo = actual.cubo
+    if len(filas):
+        delta = CuboAgregado.construir(filas, modo_distintos=modo_distintos, error_hll=error_hll)
+        cubo = CuboAgregado.combinar([cubo, delta])
+    logger.info("Instantánea actualizada de forma incremental: %d filas nuevas de %s", len(filas), archivo)
+    return Instantanea(
+        archivo, version, cubo, fecha_instantanea(archivo), actual.tamano + len(nuevos), actual.configuracion,
+        huella.hexdigest()
+    )
+
+
+class VigilanteDatos(threading.Thread):
+    """Hilo que busca nuevas instantáneas en ``directorio`` cada ``intervalo`` segundos."""
+
+    def __init__(self, fuente, directorio, patron=PATRON_INSTANTANEAS, intervalo=60, modo_distintos="exacto", error_hll=0.02,
+                 filas_por_bloque=None, procesos=None, motor="cubo"):
+        super().__init__(name="vigilante-datos", daemon=True)
+        self.fuente = fuente
+        self.directorio = directorio
+        self.patron = patron
+        self.intervalo = intervalo
+        self.modo_distintos = modo_distintos
+        self.error_hll = error_hll
+        # Para las recargas completas: lectura por bloques y número de procesos (ver ``cargar_instantanea``)
+        self.filas_por_bloque = filas_por_bloque
+        self.procesos = procesos
+        # "cubo" o un motor SQL (ver ``cargar_instantanea``); con SQL cada recarga es completa
+        self.motor = motor
+        self._detener = threading.Event()
+        # Versión que ya falló al cargarse, para no reintentarla en cada revisión
+        self._fallida = None
+
+    def run(self):
+        while not self._detener.is_set():
+            self.revisar()
+            self._detener.wait(self.intervalo)
+
+    def detener(self):
+        self._detener.set()
+
+    def revisar(self):
+        """Busca una instantánea nueva y, si la hay, la carga y la publica. Devuelve True si hubo cambio."""
+        archivo = buscar_instantanea_reciente(self.directorio, self.patron)
+        if archivo is None:
+            return False
+        actual = self.fuente.actual
+        try:
+            version = clave_archivo(archivo)
+        except OSError:
+            return False
+        mismo_archivo = os.path.abspath(archivo) == os.path.abspath(actual.archivo)
+        if (mismo_archivo and version == actual.version) or version == self._fallida:
+            return False
+
+        try:
+            nueva = cargar_incremental(actual, archivo, self.modo_distintos, self.error_hll)
+            if nueva is None:
+                nueva = cargar_instantanea(
+                    archivo, modo_distintos=self.modo_distintos, error_hll=self.error_hll,
+                    filas_por_bloque=self.filas_por_bloque, procesos=self.procesos, motor=self.motor
+                )
+        except Exception:
+            logger.exception("No se pudo cargar la instantánea %s; se sigue sirviendo la anterior", archivo)
+            self._fallida = version
+            return False
+
+        self.fuente.reemplazar(nueva)
+        logger.info("Nueva instantánea de datos en servicio: %s", archivo)
+        if not mismo_archivo:
+            # Las cachés Feather y las bases de la instantánea anterior ya no se van a leer
+            limpiar_cache(actual.archivo, extensiones=("feather",) + tuple(EXTENSIONES.values()))
+        return True
@@ -0,0 +1,139 @@
+"""Compresión, caché HTTP y medición del tamaño de las respuestas del servidor de Dash.
+
+``instalar_respuestas`` agrega al servidor Flask de una app de Dash:
+
+- Compresión Brotli (si está instalado el paquete ``brotli``) o gzip de las respuestas
+  JSON de Dash (``_dash-update-component``, el layout y las dependencias), según el
+  ``Accept-Encoding`` del navegador.
+- Encabezados de caché para ``/assets``: un año (``immutable``) cuando la URL trae una
+  huella del contenido (``?v=`` de ``url_asset`` o el ``?m=`` que Dash agrega a sus
+  scripts) y revalidación en cada carga cuando no la trae.
+- Un ``MedidorRespuestas`` con los bytes por respuesta antes y después de comprimir, por
+  ruta, consultable en ``/_bitacoras/respuestas`` para dimensionar el ancho de banda.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import threading
+
+from flask import jsonify, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - sin brotli se usa solo gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Rutas de Dash cuyas respuestas se comprimen y se miden
+RUTAS_COMPRIMIDAS = ("/_dash-update-component", "/_dash-layout", "/_dash-dependencies")
+
+# Respuestas más chicas que esto no se comprimen (el encabezado gzip no compensa)
+BYTES_MINIMOS = 500
+
+CACHE_ASSETS_CON_HUELLA = "public, max-age=31536000, immutable"
+CACHE_ASSETS_SIN_HUELLA = "no-cache"
+
+
+class MedidorRespuestas:
+    """Acumula, por ruta, el número de respuestas y sus bytes antes y después de comprimir."""
+
+    def __init__(self):
+        self._rutas = {}
+        self._candado = threading.Lock()
+
+    def registrar(self, ruta, bytes_originales, bytes_enviados):
+        with self._candado:
+            conteo = self._rutas.setdefault(ruta, [0, 0, 0])
+            conteo[0] += 1
+            conteo[1] += bytes_originales
+            conteo[2] += bytes_enviados
+        logger.debug("%s: %d -> %d bytes", ruta, bytes_originales, bytes_enviados)
+
+    def estadisticas(self):
+        """Por ruta: respuestas, bytes totales y promedio por respuesta, sin comprimir y enviados."""
+        with self._candado:
+            rutas = {ruta: list(conteo) for ruta, conteo in self._rutas.items()}
+        return {
+            ruta: {
+                "respuestas": respuestas,
+                "bytes_originales": originales,
+                "bytes_enviados": enviados,
+                "promedio_original": originales / respuestas,
+                "promedio_enviado": enviados / respuestas,
+                "proporcion": enviados / originales if originales else 1.0,
+            }
+            for ruta, (respuestas, originales, enviados) in rutas.items()
+        }
+
+
+def _codificacion_aceptada(aceptadas):
+    if brotli is not None and aceptadas["br"]:
+        return "br"
+    if aceptadas["gzip"]:
+        return "gzip"
+    return None
+
+
+def comprimir(contenido, codificacion, nivel=6):
+    """Comprime ``contenido`` con "br" o "gzip"; ``nivel`` es el de gzip (Brotli usa una calidad equivalente)."""
+    if codificacion == "br":
+        return brotli.compress(contenido, quality=min(nivel - 1, 11))
+    return gzip.compress(contenido, compresslevel=nivel, mtime=0)
+
+
+_huellas = {}
+
+
+def url_asset(app, nombre):
+    """URL de un archivo de ``assets/`` con la huella de su contenido, para poder cachearlo un año."""
+    ruta = os.path.join(app.config.assets_folder, nombre)
+    estado = os.stat(ruta)
+    clave = (ruta, estado.st_size, estado.st_mtime_ns)
+    if clave not in _huellas:
+        with open(ruta, "rb") as f:
+            _huellas[clave] = hashlib.sha256(f.read()).hexdigest()[:12]
+    return f"{app.get_asset_url(nombre)}?v={_huellas[clave]}"
+
+
+def instalar_respuestas(app, comprimir_respuestas=True, nivel=6, medidor=None, otras_rutas=()):
+    """Instala compresión, caché de assets y medición de bytes en el servidor de ``app``; devuelve el medidor.
+
+    ``otras_rutas`` son rutas del servidor, fuera de las de Dash, que también se comprimen y se miden.
+    """
+    medidor = medidor or MedidorRespuestas()
+    servidor = app.server
+    prefijo_assets = app.get_asset_url("")
+    rutas = tuple(app.config.requests_pathname_prefix.rstrip("/") + ruta for ruta in RUTAS_COMPRIMIDAS) + tuple(otras_rutas)
+
+    @servidor.after_request
+    def procesar_respuesta(respuesta):
+        ruta = request.path
+        if ruta.startswith(prefijo_assets):
+            con_huella = "v" in request.args or "m" in request.args
+            respuesta.headers["Cache-Control"] = CACHE_ASSETS_CON_HUELLA if con_huella else CACHE_ASSETS_SIN_HUELLA
+            return respuesta
+        if ruta not in rutas or respuesta.direct_passthrough or respuesta.status_code != 200:
+            return respuesta
+
+        contenido = respuesta.get_data()
+        enviados = len(contenido)
+        codificacion = _codificacion_aceptada(request.accept_encodings)
+        if (
+            comprimir_respuestas and codificacion and len(contenido) >= BYTES_MINIMOS
+            and "Content-Encoding" not in respuesta.headers
+        ):
+            comprimido = comprimir(contenido, codificacion, nivel)
+            respuesta.set_data(comprimido)
+            respuesta.headers["Content-Encoding"] = codificacion
+            enviados = len(comprimido)
+        respuesta.vary.add("Accept-Encoding")
+        medidor.registrar(ruta, len(contenido), enviados)
+        return respuesta
+
+    @servidor.route("/_bitacoras/respuestas")
+    def estadisticas_respuestas():
+        return jsonify(medidor.estadisticas())
+
+    return medidor
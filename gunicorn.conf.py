@@ -0,0 +1,43 @@
+"""Configuración de gunicorn para ``gunicorn app:app``.
+
+Con ``preload_app`` el módulo ``app`` (carga de datos, índice, cubo y precalentado de la
+caché) se importa una sola vez en el proceso maestro antes de crear los workers, que lo
+heredan por copy-on-write en lugar de cargar cada uno su propia copia.
+
+Las nuevas instantáneas de los datos también se cargan solo en el maestro: el hilo que las
+vigila corre ahí y, cuando publica una, el maestro se envía ``HUP``. Gunicorn arranca
+workers nuevos a partir del maestro (que ya tiene el cubo nuevo y las cachés precalentadas,
+sin volver a importar ``app``) y detiene los viejos cuando terminan sus peticiones, así que
+el cubo sigue compartido entre workers después de cada recarga.
+"""
+import gc
+import os
+import signal
+
+preload_app = True
+
+
+def when_ready(server):
+    from app import app, iniciar_vigilancia
+
+    if iniciar_vigilancia(app) is None:
+        return
+
+    def reiniciar_workers(nueva):
+        # Los objetos congelados en cada pre_fork no los recorre el GC: se liberan para que la
+        # instantánea anterior se pueda recolectar antes de volver a congelar
+        gc.unfreeze()
+        gc.collect()
+        os.kill(os.getpid(), signal.SIGHUP)
+
+    app.fuente.suscribir(reiniciar_workers)
+    # Un worker nunca nace a mitad de una publicación (con las cachés a medio invalidar o sus
+    # candados tomados por el hilo vigilante)
+    candado = app.fuente.candado
+    os.register_at_fork(before=candado.acquire, after_in_parent=candado.release, after_in_child=candado.release)
+
+
+def pre_fork(server, worker):
+    # Pasar los objetos ya creados a la generación permanente del recolector: así el GC de
+    # cada worker no escribe en sus encabezados y las páginas compartidas no se copian
+    gc.freeze()